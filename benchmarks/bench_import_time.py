@@ -0,0 +1,85 @@
+"""Startup benchmark: time to import main.py plus the modules of each stage combination.
+
+Every measurement runs in a fresh interpreter, so nothing is cached
+between combinations. With --budget the script exits non-zero if any
+combination starts slower than the budget, which makes it usable as a
+guard against an eager heavy import creeping back in.
+
+Usage:
+    python -m benchmarks.bench_import_time [--repeat 3] [--all-combinations] [--budget 1.5]
+"""
+import os
+import sys
+import json
+import argparse
+import itertools
+import subprocess
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import sys, json, time, resource
+start = time.perf_counter()
+import main
+from modules.stages import STAGES
+for name in sys.argv[1:]:
+    STAGES[name].load()
+elapsed = time.perf_counter() - start
+print(json.dumps({
+    'seconds': elapsed,
+    'modules': len(sys.modules),
+    'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+}))
+"""
+
+def measure(stages, repeat, workdir):
+    """Best-of-``repeat`` startup for one stage combination, or an error message."""
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    best = None
+    for _ in range(repeat):
+        # Run outside the repository so importing main does not leave log files there
+        completed = subprocess.run([sys.executable, "-c", CHILD] + list(stages), cwd=workdir, env=env,
+                                   capture_output=True, text=True)
+        if completed.returncode != 0:
+            return None, completed.stderr.strip().splitlines()[-1]
+        sample = json.loads(completed.stdout.strip().splitlines()[-1])
+        if best is None or sample['seconds'] < best['seconds']:
+            best = sample
+    return best, None
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLI startup per stage combination.")
+    parser.add_argument('--repeat', type=int, default=3, help="Fresh interpreters per combination; the fastest is reported (default: 3).")
+    parser.add_argument('--all-combinations', action='store_true', help="Measure every subset of stages instead of none, each alone and all.")
+    parser.add_argument('--budget', type=float, default=None, help="Fail if any combination takes longer than this many seconds.")
+    args = parser.parse_args()
+
+    sys.path.insert(0, ROOT)
+    from modules.stages import STAGES
+    names = list(STAGES)
+    if args.all_combinations:
+        combinations = [combo for size in range(len(names) + 1) for combo in itertools.combinations(names, size)]
+    else:
+        combinations = [()] + [(name,) for name in names] + [tuple(names)]
+
+    over_budget = []
+    print(f"{'stages':<60}{'seconds':>9}{'modules':>9}{'RSS MB':>8}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for combo in combinations:
+            label = ",".join(combo) or "(none)"
+            result, error = measure(combo, args.repeat, workdir)
+            if error:
+                print(f"{label:<60}  failed: {error}")
+                over_budget.append(label)
+                continue
+            print(f"{label:<60}{result['seconds']:>9.3f}{result['modules']:>9}{result['max_rss_kb'] / 1024:>8.1f}")
+            if args.budget is not None and result['seconds'] > args.budget:
+                over_budget.append(label)
+
+    if args.budget is not None and over_budget:
+        print(f"Over the {args.budget}s budget or failed: {', '.join(over_budget)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Benchmark the streaming JavaScript lexer on synthetic bundle shapes.
+
+Each shape mimics something real scans meet: minified webpack chunks,
+bundles dominated by string tables, regex-heavy validation code,
+readable source with comments and template literals, and deeply nested
+object literals. Input is fed in chunks to measure the streaming path, and each shape is
+checked to lex to the same tokens in chunks as in one piece.
+
+Usage:
+    python -m benchmarks.bench_js_lexer [--size-mb 4] [--chunk-kb 64]
+"""
+import ast
+import time
+import random
+import argparse
+import tracemalloc
+from modules.js_lexer import JSLexer, JSFeatureExtractor, tokenize
+
+def _repeat_until(size, make_piece):
+    pieces = []
+    total = 0
+    i = 0
+    while total < size:
+        piece = make_piece(i)
+        pieces.append(piece)
+        total += len(piece)
+        i += 1
+    return "".join(pieces)
+
+def minified_bundle(size, rng):
+    return _repeat_until(size, lambda i: (
+        f'{i}:function(e,t,n){{"use strict";var r=n({rng.randint(0, 999)}),o=n.n(r);'
+        f't.a=function(e){{return o()("/api/v1/items/"+e,{{method:"GET",params:{{page:e,limit:{i % 50}}}}})}}}},'
+    ))
+
+def string_table_bundle(size, rng):
+    return _repeat_until(size, lambda i: (
+        f'"msg_{i}":"Lorem ipsum dolor sit amet {rng.random()} consectetur \\"quoted\\" adipiscing elit",'
+    ))
+
+def regex_heavy_bundle(size, rng):
+    return _repeat_until(size, lambda i: (
+        f'var v{i}=/^[a-z0-9._%+-]+@[a-z0-9.-]+\\.[a-z]{{2,}}$/i.test(x)?a/{i + 1}:b/2;'
+        f'if(/\\d{{3}}-[/]\\d{{4}}/.test(y))z={i}/3;'
+    ))
+
+def readable_source(size, rng):
+    return _repeat_until(size, lambda i: (
+        f'// Handler number {i}\n'
+        f'/* Fetches the record and renders it */\n'
+        f'async function handler{i}(id) {{\n'
+        f'  const res = await fetch(`/api/records/${{id}}?v={i}`, {{ headers: {{ "X-Req": "{i}" }} }});\n'
+        f'  return axios.post("/api/audit", {{ recordId: id, action: "view" }});\n'
+        f'}}\n'
+    ))
+
+def nested_objects(size, rng):
+    depth = 40
+    return _repeat_until(size, lambda i: "{a%d:" % i * depth + "1" + "}" * depth + ";")
+
+SHAPES = {
+    'minified': minified_bundle,
+    'string_table': string_table_bundle,
+    'regex_heavy': regex_heavy_bundle,
+    'readable': readable_source,
+    'nested': nested_objects,
+}
+
+def lex_streaming(text, chunk_size):
+    lexer = JSLexer()
+    extractor = JSFeatureExtractor()
+    tokens = 0
+    for start in range(0, len(text), chunk_size):
+        for token in lexer.feed(text[start:start + chunk_size]):
+            extractor.add(token)
+            tokens += 1
+    for token in lexer.close():
+        extractor.add(token)
+        tokens += 1
+    return tokens, extractor.result()
+
+def check_chunking(text, chunk_size):
+    """Fail unless lexing in chunks yields exactly the tokens of lexing the whole text."""
+    lexer = JSLexer()
+    chunked = []
+    for start in range(0, len(text), chunk_size):
+        chunked.extend(lexer.feed(text[start:start + chunk_size]))
+    chunked.extend(lexer.close())
+    whole = list(tokenize(text))
+    if chunked != whole:
+        index = next((i for i, (a, b) in enumerate(zip(chunked, whole)) if a != b), min(len(chunked), len(whole)))
+        raise AssertionError(f"chunked lexing differs from whole-text lexing at token {index}: "
+                             f"{chunked[index:index + 3]} vs {whole[index:index + 3]} "
+                             f"({len(chunked)} vs {len(whole)} tokens)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the JavaScript lexer.")
+    parser.add_argument('--size-mb', type=float, default=4, help="Size of each synthetic bundle (default: 4).")
+    parser.add_argument('--chunk-kb', type=int, default=64, help="Chunk size fed to the lexer (default: 64).")
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    size = int(args.size_mb * 1024 * 1024)
+    chunk_size = args.chunk_kb * 1024
+
+    print(f"{'shape':<14}{'MB':>6}{'tokens':>11}{'seconds':>9}{'MB/s':>7}{'lexer peak KB':>15}{'ast.parse':>12}")
+    for name, make in SHAPES.items():
+        text = make(size, rng)
+        check_chunking(text, chunk_size)
+
+        start = time.perf_counter()
+        tokens, _ = lex_streaming(text, chunk_size)
+        elapsed = time.perf_counter() - start
+
+        # Memory is measured in a separate run; tracemalloc slows allocation-heavy code
+        tracemalloc.start()
+        lex_streaming(text, chunk_size)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        # What parse_js_with_ast used to spend before failing
+        start = time.perf_counter()
+        try:
+            ast.parse(text)
+            legacy = "parsed"
+        except (SyntaxError, ValueError, RecursionError, MemoryError):
+            legacy = f"fail {time.perf_counter() - start:.2f}s"
+
+        megabytes = len(text) / 1e6
+        print(f"{name:<14}{megabytes:>6.1f}{tokens:>11}{elapsed:>9.2f}{megabytes / elapsed:>7.1f}{peak // 1024:>15}{legacy:>12}")
+
+if __name__ == "__main__":
+    main()
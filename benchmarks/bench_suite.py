@@ -0,0 +1,317 @@
+"""End-to-end benchmarks of every stage and the full pipeline against local fixture sites.
+
+A fixture server (benchmarks/fixture_server.py) runs in this process; each
+benchmark runs in a fresh interpreter driven by FixtureDriver, so peak RSS
+is per benchmark and nothing touches the network beyond 127.0.0.1.
+
+Benchmarks:
+    input_fields      extract_input_fields on a page with thousands of inputs
+    js_files          search_js_files on a page with multi-MB bundles, no cache
+    js_files_cached   the same with a warm JSCache (revalidated with 304s)
+    crawl             crawl_website over a deep link graph
+    reflected_values  test_reflected_values against reflective forms
+    network_requests  analyze_network_requests over a chatty XHR page's traffic
+    pipeline          main.analyze_url with every stage over every fixture site
+
+Each reports latency percentiles per iteration, throughput in its own unit
+(fields, bytes, pages, probes, requests, URLs) and peak RSS. --output saves
+the results as a JSON baseline; --compare checks a run against one.
+
+Usage:
+    python -m benchmarks.bench_suite [--only crawl,js_files] [--iterations 5] [--scale 1.0]
+                                     [--output baseline.json] [--compare baseline.json [--tolerance 0.25]]
+"""
+import os
+import sys
+import json
+import math
+import time
+import resource
+import platform
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+BENCHMARKS = ('input_fields', 'js_files', 'js_files_cached', 'crawl', 'reflected_values', 'network_requests', 'pipeline')
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a list of numbers."""
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+def peak_rss_mb(who):
+    rss = resource.getrusage(who).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def sizes(scale):
+    """Fixture sizes for a scale factor."""
+    def scaled(value):
+        return max(1, int(value * scale))
+    return {
+        'inputs': scaled(3000),
+        'bundles': 8,
+        'bundle_kb': scaled(512),
+        'nodes': scaled(2000),
+        'max_pages': scaled(500),
+        'xhr': scaled(200),
+    }
+
+# -- Benchmarks. Each prepares its fixture and returns (iteration, unit): a
+# -- function running the stage once and returning the amount of work done.
+
+def prepare_input_fields(base_url, size, workdir):
+    from modules.page_snapshot import PageSnapshot
+    from modules.input_extractor import extract_input_fields
+    from benchmarks.fixture_server import FixtureDriver
+    driver = FixtureDriver()
+    driver.get(f"{base_url}inputs?n={size['inputs']}")
+
+    def iteration():
+        return len(extract_input_fields(driver, PageSnapshot.from_driver(driver)))
+    return iteration, "fields"
+
+def _prepare_js(base_url, size, workdir, cached):
+    from urllib.parse import urlparse
+    from modules.page_snapshot import PageSnapshot
+    from modules.js_cache import JSCache
+    from modules.js_analyzer import search_js_files, create_analysis_executor
+    from modules.scheduler import run_in_worker_loop
+    from benchmarks.fixture_server import FixtureDriver
+    driver = FixtureDriver()
+    url = f"{base_url}scripts?count={size['bundles']}&kb={size['bundle_kb']}"
+    driver.get(url)
+    snapshot = PageSnapshot.from_driver(driver)
+    executor = create_analysis_executor()
+    cache = JSCache(os.path.join(workdir, "js-cache")) if cached else None
+    total = size['bundles'] * size['bundle_kb'] * 1024
+
+    def iteration():
+        results = run_in_worker_loop(search_js_files(driver, url, urlparse(url).netloc, snapshot, cache, executor))
+        if len(results) != size['bundles']:
+            raise RuntimeError(f"Analyzed {len(results)} of {size['bundles']} bundles")
+        return total
+    return iteration, "bytes"
+
+def prepare_js_files(base_url, size, workdir):
+    return _prepare_js(base_url, size, workdir, cached=False)
+
+def prepare_js_files_cached(base_url, size, workdir):
+    return _prepare_js(base_url, size, workdir, cached=True)
+
+def prepare_crawl(base_url, size, workdir):
+    from urllib.parse import urlparse
+    from modules.crawler import crawl_website
+    from benchmarks.fixture_server import FixtureDriver
+    driver = FixtureDriver()
+    url = f"{base_url}graph/0?nodes={size['nodes']}&branching=4"
+
+    def iteration():
+        return len(crawl_website(driver, url, urlparse(url).netloc, max_depth=8, max_pages=size['max_pages']))
+    return iteration, "pages"
+
+def prepare_reflected_values(base_url, size, workdir):
+    from urllib.parse import urlparse
+    from modules.page_snapshot import PageSnapshot
+    from modules.scheduler import run_in_worker_loop
+    from modules.reflected_value_tester import test_reflected_values, build_probes, rank_payloads
+    from benchmarks.fixture_server import FixtureDriver
+    driver = FixtureDriver()
+    url = f"{base_url}reflect?q=test&lang=en"
+    driver.get(url)
+    snapshot = PageSnapshot.from_driver(driver)
+    probes = len(build_probes(snapshot, rank_payloads("html")))
+
+    def iteration():
+        run_in_worker_loop(test_reflected_values(driver, urlparse(url).netloc, snapshot))
+        return probes
+    return iteration, "probes"
+
+def prepare_network_requests(base_url, size, workdir):
+    from urllib.parse import urlparse
+    from modules.blob_store import BlobStore
+    from modules.network_analyzer import analyze_network_requests
+    from benchmarks.fixture_server import FixtureDriver
+    driver = FixtureDriver()
+    url = f"{base_url}xhr?n={size['xhr']}"
+    driver.get(url)
+    blobs = BlobStore(os.path.join(workdir, "blobs"))
+
+    def iteration():
+        return len(analyze_network_requests(driver, urlparse(url).netloc, blobs=blobs))
+    return iteration, "requests"
+
+def prepare_pipeline(base_url, size, workdir):
+    import main
+    from modules.driver_pool import DriverPool
+    from modules.results_sink import ResultsSink
+    from modules.scheduler import ScanScheduler, run_in_worker_loop
+    from modules.stages import enabled_stages, setup_stages
+    from benchmarks.fixture_server import FixtureDriver
+    urls = [
+        f"{base_url}inputs?n={size['inputs']}",
+        f"{base_url}scripts?count={size['bundles']}&kb={size['bundle_kb']}",
+        f"{base_url}graph/0?nodes={size['nodes']}&branching=4",
+        f"{base_url}reflect?q=test&lang=en",
+        f"{base_url}xhr?n={size['xhr']}",
+    ]
+    args = argparse.Namespace(
+        input_fields=True, network_requests=True, hidden_parameters=True, js_files=True, reflected_values=True,
+        crawl=True, discover_params=None, crawl_depth=2, crawl_max_pages=size['max_pages'] // 5, crawl_fetchers=16,
+        crawl_visited='auto', js_cache_dir=os.path.join(workdir, "js-cache"), js_cache_size=512, no_js_cache=True,
+        js_max_size=20, js_workers=None, reflect_concurrency=20, reflect_dom=False, output_dir=workdir)
+    stages = enabled_stages(args)
+    resources = setup_stages(stages, args)
+    driver_pool = DriverPool(size=2, factory=FixtureDriver)
+    scheduler = ScanScheduler(workers=2, max_per_host=len(urls))
+    sink = ResultsSink(os.path.join(workdir, "results"))
+
+    def job(url):
+        return run_in_worker_loop(main.analyze_url(url, args, driver_pool, stages, resources, sink))
+
+    def iteration():
+        results = [result for _, result in scheduler.run(urls, job)]
+        failed = [result for result in results if isinstance(result, Exception)]
+        if failed:
+            raise failed[0]
+        return len(results)
+    return iteration, "urls"
+
+def run_child(name, base_url, iterations, scale):
+    """Run one benchmark in this process and return its measurements."""
+    import logging
+    workdir = os.getcwd()
+    iteration, unit = globals()[f"prepare_{name}"](base_url, sizes(scale), workdir)
+    # Scanner logging would otherwise dominate some timings
+    logging.disable(logging.INFO)
+    iteration()  # warm-up: imports, connection pools, process pools, caches
+
+    latencies, work = [], 0
+    for _ in range(iterations):
+        start = time.perf_counter()
+        work += iteration()
+        latencies.append(time.perf_counter() - start)
+    total = sum(latencies)
+    return {
+        'iterations': iterations,
+        'latency_ms': {
+            'p50': round(percentile(latencies, 0.50) * 1000, 3),
+            'p90': round(percentile(latencies, 0.90) * 1000, 3),
+            'p99': round(percentile(latencies, 0.99) * 1000, 3),
+            'mean': round(total / iterations * 1000, 3),
+            'max': round(max(latencies) * 1000, 3),
+        },
+        'throughput': {'unit': f"{unit}/s", 'value': round(work / total, 3)},
+        'peak_rss_mb': peak_rss_mb(resource.RUSAGE_SELF),
+        'peak_child_rss_mb': peak_rss_mb(resource.RUSAGE_CHILDREN),
+    }
+
+def run_isolated(name, base_url, iterations, scale, workdir):
+    """Run a benchmark in a fresh interpreter inside workdir; return (result, error)."""
+    env = dict(os.environ, PYTHONPATH=ROOT + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    command = [sys.executable, "-m", "benchmarks.bench_suite", "--child", name, "--base-url", base_url,
+               "--iterations", str(iterations), "--scale", str(scale)]
+    completed = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        lines = completed.stderr.strip().splitlines() or ["exited with status %d" % completed.returncode]
+        return None, lines[-1]
+    return json.loads(completed.stdout.strip().splitlines()[-1]), None
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def compare(results, baseline, tolerance):
+    """Print p50 latency and throughput against a baseline; return the names that regressed."""
+    regressed = []
+    print(f"\n{'benchmark':<20}{'p50 ms':>12}{'baseline':>12}{'change':>9}{'throughput':>14}{'baseline':>12}{'change':>9}")
+    for name, result in results.items():
+        before = baseline.get('benchmarks', {}).get(name)
+        if not result or not before:
+            continue
+        latency, old_latency = result['latency_ms']['p50'], before['latency_ms']['p50']
+        rate, old_rate = result['throughput']['value'], before['throughput']['value']
+        latency_change = latency / old_latency - 1 if old_latency else 0.0
+        rate_change = rate / old_rate - 1 if old_rate else 0.0
+        print(f"{name:<20}{latency:>12.1f}{old_latency:>12.1f}{latency_change:>+9.0%}{rate:>14.1f}{old_rate:>12.1f}{rate_change:>+9.0%}")
+        if latency_change > tolerance or rate_change < -tolerance:
+            regressed.append(name)
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every stage and the full pipeline against local fixture sites.")
+    parser.add_argument('--only', default=None, help=f"Comma-separated benchmarks to run (default: all of {', '.join(BENCHMARKS)}).")
+    parser.add_argument('--iterations', type=int, default=5, help="Timed iterations per benchmark, after one warm-up (default: 5).")
+    parser.add_argument('--scale', type=float, default=1.0, help="Multiply fixture sizes (inputs, bundle size, graph, XHR count) (default: 1.0).")
+    parser.add_argument('--output', default=None, help="Write the results to this JSON file, e.g. to keep as a baseline.")
+    parser.add_argument('--compare', default=None, help="Compare against a baseline JSON file written with --output.")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="With --compare, fail if p50 latency rises or throughput falls by more than this fraction (default: 0.25).")
+    parser.add_argument('--child', default=None, help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.base_url, args.iterations, args.scale)))
+        return
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}")
+
+    sys.path.insert(0, ROOT)
+    from benchmarks.fixture_server import start_fixture_server
+    server, base_url = start_fixture_server()
+    results = {}
+    print(f"{'benchmark':<20}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'throughput':>22}{'RSS MB':>9}")
+    try:
+        for name in names:
+            # A fresh directory per benchmark: caches, reports and result files never carry over
+            with tempfile.TemporaryDirectory() as workdir:
+                result, error = run_isolated(name, base_url, args.iterations, args.scale, workdir)
+            results[name] = result
+            if error:
+                print(f"{name:<20}  failed: {error}")
+                continue
+            latency, throughput = result['latency_ms'], result['throughput']
+            print(f"{name:<20}{latency['p50']:>10.1f}{latency['p90']:>10.1f}{latency['p99']:>10.1f}"
+                  f"{throughput['value']:>12.1f} {throughput['unit']:<9}{result['peak_rss_mb']:>9.1f}")
+    finally:
+        server.shutdown()
+
+    report = {
+        'meta': {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'iterations': args.iterations,
+            'scale': args.scale,
+        },
+        'benchmarks': results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=4)
+        print(f"Results written to {args.output}")
+
+    failed = [name for name, result in results.items() if result is None]
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        if baseline.get('meta', {}).get('scale') != args.scale:
+            print(f"Warning: baseline was recorded at scale {baseline.get('meta', {}).get('scale')}, this run at {args.scale}")
+        regressed = compare(results, baseline, args.tolerance)
+        if regressed:
+            print(f"Slower than the baseline by more than {args.tolerance:.0%}: {', '.join(regressed)}")
+            failed += regressed
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""Local fixture web server with synthetic sites for offline benchmarks.
+
+Routes (sizes come from the query string, so one server serves every scale):
+    /                       index linking to every site
+    /inputs?n=3000          a page with n inputs, selects and textareas in forms of 50
+    /scripts?count=8&kb=512 a page loading `count` synthetic bundles of `kb` KB each
+    /bundle/<seed>.js?kb=   a deterministic minified-looking bundle (ETag / 304 supported)
+    /graph/<n>?nodes=&branching=
+                            node n of a link graph: children, parent and two cross links
+    /reflect?q=&lang=       reflects q and lang, with a GET and a POST form (POST /comment)
+    /xhr?n=200              fires n fetch() calls listed in a JSON plan: JSON items, JSON
+                            POST events, images and a few large JSON responses
+    /robots.txt             allows everything
+
+FixtureDriver stands in for the browser: an HttpDriver that also replays the
+/xhr plan, recording traffic the way selenium-wire does, so every stage can
+run without Chrome.
+
+Usage:
+    python -m benchmarks.fixture_server [--port 8000]
+"""
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import hashlib
+import argparse
+import threading
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qs, urlencode
+import requests
+from modules.drivers import HttpDriver, CapturedRequest, CapturedResponse
+from benchmarks.bench_pattern_engine import synthetic_bundle
+
+_bundles = {}
+_bundles_lock = threading.Lock()
+
+def bundle(seed, kb):
+    """Return (body, etag) of a synthetic bundle, generated once per (seed, kb)."""
+    with _bundles_lock:
+        if (seed, kb) not in _bundles:
+            body = synthetic_bundle(kb / 1024, seed=seed).encode('utf-8')
+            _bundles[(seed, kb)] = (body, '"' + hashlib.sha1(body).hexdigest() + '"')
+        return _bundles[(seed, kb)]
+
+def page(title, body):
+    return f"<!DOCTYPE html><html><head><title>{title}</title></head><body>{body}</body></html>"
+
+FILLER = "<p>" + "This fixture page exists to exercise the scanner with a realistic amount of text. " * 4 + "</p>"
+
+def index_page():
+    links = ["/inputs?n=3000", "/scripts?count=8&kb=512", "/graph/0?nodes=2000&branching=4", "/reflect?q=test&lang=en", "/xhr?n=200"]
+    return page("Fixtures", FILLER + "".join(f'<a href="{link}">{escape(link)}</a>' for link in links))
+
+def inputs_page(n):
+    kinds = ['text', 'email', 'hidden', 'password', 'number', 'search', 'checkbox', 'date']
+    forms = []
+    for start in range(0, n, 50):
+        fields = []
+        for i in range(start, min(start + 50, n)):
+            if i % 25 == 0:
+                fields.append(f'<textarea name="notes{i}" placeholder="Notes {i}"></textarea>')
+            elif i % 20 == 0:
+                fields.append(f'<select name="choice{i}"><option value="a">A</option><option value="b">B</option></select>')
+            else:
+                fields.append(f'<input type="{kinds[i % len(kinds)]}" name="field{i}" id="f{i}" placeholder="Field {i}" value="v{i}">')
+        forms.append(f'<form id="form{start // 50}" action="/submit" method="post">{"".join(fields)}</form>')
+    editable = "".join(f'<div contenteditable="true" id="edit{i}">Edit {i}</div>' for i in range(n // 100))
+    return page(f"{n} inputs", FILLER + "".join(forms) + editable)
+
+def scripts_page(count, kb):
+    tags = "".join(f'<script src="/bundle/{seed}.js?kb={kb}"></script>' for seed in range(1, count + 1))
+    inline = '<script>var api_key = "AKIAFIXTURE1234567890"; fetch("/api/item/1?page=1");</script>'
+    return page(f"{count} bundles", FILLER + tags + inline)
+
+def graph_page(node, nodes, branching):
+    query = urlencode({'nodes': nodes, 'branching': branching})
+    rng = random.Random(node)
+    targets = [node * branching + k for k in range(1, branching + 1)]
+    targets += [(node - 1) // branching] if node else []
+    targets += [rng.randrange(nodes) for _ in range(2)]
+    links = "".join(f'<a href="/graph/{target}?{query}">Node {target}</a> ' for target in targets if target < nodes)
+    return page(f"Node {node}", FILLER + links)
+
+def reflect_page(q, lang):
+    # Reflected unescaped on purpose; the timestamp and request id vary on every load
+    return page("Search", FILLER + f"""
+<p>Results for {q}</p>
+<div lang="{lang}">Language: {lang}</div>
+<span>Generated at {time.strftime('%Y-%m-%dT%H:%M:%S')} request {uuid.uuid4()}</span>
+<form action="/reflect" method="get"><input name="q" value="{escape(q)}"><input name="lang" value="{escape(lang)}"><input name="page" value="1"></form>
+<form action="/comment" method="post"><input name="name" value="guest"><textarea name="comment"></textarea><input type="email" name="email"></form>""")
+
+def xhr_plan(n):
+    plan = []
+    for i in range(n):
+        if i % 7 == 0:
+            plan.append({'method': 'GET', 'url': f"/api/image/{i}.png"})
+        elif i % 5 == 0:
+            plan.append({'method': 'POST', 'url': "/api/event", 'body': {'event': 'view', 'item': i, 'token': f"tok{i}"}})
+        else:
+            plan.append({'method': 'GET', 'url': f"/api/item/{i}?page={i % 10}"})
+    return plan
+
+def xhr_page(n):
+    plan = json.dumps(xhr_plan(n))
+    script = ("JSON.parse(document.getElementById('xhr-plan').textContent).forEach(function (r) {"
+              " fetch(r.url, r.body ? {method: r.method, headers: {'Content-Type': 'application/json'}, body: JSON.stringify(r.body)}"
+              " : {method: r.method}); });")
+    return page(f"{n} requests", f'<script type="application/json" id="xhr-plan">{plan}</script><script>{script}</script>')
+
+def api_item(i):
+    item = {'id': i, 'name': f"Item {i}", 'owner': f"user{i}@example.org", 'tags': [f"t{k}" for k in range(10)]}
+    if i % 10 == 3:
+        # A few large responses go over the inline limit
+        item['history'] = [{'at': k, 'value': 'x' * 64} for k in range(4000)]
+    return json.dumps(item).encode('utf-8')
+
+def api_image(i):
+    size = 20 * 1024
+    return b"\x89PNG\r\n\x1a\n" + random.Random(i).getrandbits(8 * size).to_bytes(size, "little")
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        query = {key: values[-1] for key, values in parse_qs(parts.query, keep_blank_values=True).items()}
+        path = parts.path
+
+        def number(name, default):
+            try:
+                return int(query.get(name, default))
+            except ValueError:
+                return default
+
+        if path == "/":
+            return self.respond(index_page())
+        if path == "/robots.txt":
+            return self.respond("User-agent: *\nAllow: /\n", "text/plain")
+        if path == "/inputs":
+            return self.respond(inputs_page(number('n', 3000)))
+        if path == "/scripts":
+            return self.respond(scripts_page(number('count', 8), number('kb', 512)))
+        match = re.fullmatch(r"/bundle/(\d+)\.js", path)
+        if match:
+            body, etag = bundle(int(match.group(1)), number('kb', 512))
+            if self.headers.get('If-None-Match') == etag:
+                return self.respond(b"", "application/javascript", status=304, headers={'ETag': etag})
+            return self.respond(body, "application/javascript", headers={'ETag': etag})
+        match = re.fullmatch(r"/graph/(\d+)", path)
+        if match:
+            return self.respond(graph_page(int(match.group(1)), number('nodes', 2000), number('branching', 4)))
+        if path == "/reflect":
+            return self.respond(reflect_page(query.get('q', ''), query.get('lang', 'en')))
+        if path == "/xhr":
+            return self.respond(xhr_page(number('n', 200)))
+        match = re.fullmatch(r"/api/item/(\d+)", path)
+        if match:
+            return self.respond(api_item(int(match.group(1))), "application/json")
+        match = re.fullmatch(r"/api/image/(\d+)\.png", path)
+        if match:
+            return self.respond(api_image(int(match.group(1))), "image/png")
+        return self.respond(page("Not found", "Not found"), status=404)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b""
+        path = urlsplit(self.path).path
+        if path == "/api/event":
+            return self.respond(json.dumps({'ok': True, 'received': len(body)}), "application/json")
+        if path in ("/comment", "/submit"):
+            fields = {key: values[-1] for key, values in parse_qs(body.decode('utf-8', 'replace')).items()}
+            return self.respond(page("Thanks", FILLER + f"<p>Thanks {fields.get('name', '')}: {fields.get('comment', '')}</p>"))
+        return self.respond(page("Not found", "Not found"), status=404)
+
+    def respond(self, body, content_type="text/html; charset=utf-8", status=200, headers=None):
+        data = body.encode('utf-8') if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD" and status != 304:
+            self.wfile.write(data)
+
+class FixtureServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients closing keep-alive connections mid-read are expected
+        if isinstance(sys.exc_info()[1], (ConnectionResetError, BrokenPipeError)):
+            return
+        super().handle_error(request, client_address)
+
+def start_fixture_server(host="127.0.0.1", port=0):
+    """Serve the fixtures on a background thread; return (server, base URL)."""
+    server = FixtureServer((host, port), FixtureHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/"
+
+class FixtureDriver(HttpDriver):
+    """HttpDriver that also replays the /xhr page's request plan.
+
+    The plan's calls go over HTTP after the page loads, so ``requests`` holds
+    what selenium-wire would have captured from the page's fetch() calls.
+    """
+
+    XHR_PLAN = re.compile(r'<script type="application/json" id="xhr-plan">(.*?)</script>', re.S)
+
+    def __init__(self):
+        # A plain session keeps fixture traffic out of the http_requests metrics
+        super().__init__(session=requests.Session())
+
+    def get(self, url):
+        super().get(url)
+        match = self.XHR_PLAN.search(self.page_source)
+        if match:
+            for call in json.loads(match.group(1)):
+                self._send(call['method'], requests.compat.urljoin(self.current_url, call['url']), call.get('body'))
+
+    def _send(self, method, url, json_body=None):
+        response = self.session.request(method, url, json=json_body, timeout=self.timeout)
+        request = response.request
+        body = request.body.encode('utf-8') if isinstance(request.body, str) else request.body or b""
+        self.record(CapturedRequest(
+            method, request.url, dict(request.headers), body,
+            CapturedResponse(response.status_code, response.reason, dict(response.headers), response.content)))
+        return response
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the benchmark fixture sites.")
+    parser.add_argument('--host', default="127.0.0.1", help="Interface to listen on (default: 127.0.0.1).")
+    parser.add_argument('--port', type=int, default=8000, help="Port to listen on (default: 8000).")
+    args = parser.parse_args()
+    server, base_url = start_fixture_server(args.host, args.port)
+    print(f"Serving fixtures at {base_url} (Ctrl+C to stop)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
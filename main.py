@@ -2,19 +2,20 @@ import argparse
 import asyncio
 import logging
 import os
-import time
+import functools
 from urllib.parse import urlparse
-from collections import defaultdict
 from jsonschema import validate, ValidationError
 from dotenv import load_dotenv
-from modules.selenium_setup import setup_selenium
-from modules.input_extractor import extract_input_fields
-from modules.network_analyzer import analyze_network_requests
-from modules.hidden_parameter_extractor import extract_hidden_parameters
-from modules.js_analyzer import search_js_files
-from modules.reflected_value_tester import test_reflected_values
-from modules.crawler import crawl_website
-from modules.utils import ensure_url_scheme, save_results_to_json
+from modules.driver_pool import DriverPool
+from modules.scheduler import ScanScheduler, run_in_worker_loop, close_worker_loops
+from modules.page_snapshot import PageSnapshot
+from modules.http_client import close_session, reset_cookies
+from modules.stages import StageContext, enabled_stages, needs_browser, setup_stages, teardown_stages
+from modules.drivers import BACKENDS, HttpDriver, needs_js_rendering
+from modules.results_sink import ResultsSink
+from modules.metrics import metrics
+from modules.job_journal import JobJournal
+from modules.utils import ensure_url_scheme, read_urls
 
 # Load environment variables
 load_dotenv()
@@ -26,7 +27,8 @@ logging.basicConfig(
     handlers=[logging.FileHandler("analysis.log"), logging.StreamHandler()]
 )
 
-# Schema for results validation
+# Schema for results validation. Stage results are validated one key at a
+# time as they are written, so no key is required.
 SCHEMA = {
     "type": "object",
     "properties": {
@@ -35,124 +37,214 @@ SCHEMA = {
         "hidden_parameters": {"type": "object"},
         "js_files": {"type": "array"},
         "reflected_values": {"type": "array"},
+        "discovered_parameters": {"type": "array"},
+        "crawled_urls": {"type": "array", "items": {"type": "string"}},
         "errors": {"type": "array"},
     },
-    "required": ["input_fields", "network_requests", "hidden_parameters", "js_files", "reflected_values", "errors"],
 }
 
-# Metrics tracking
-metrics = defaultdict(list)
-
 def track_metrics(func):
-    """Decorator to track performance metrics."""
+    """Decorator recording wall and CPU time of every call as ``<function name>_seconds``.
+
+    Coroutine functions are timed until the coroutine finishes, not just
+    until it is created.
+    """
+    if asyncio.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            with metrics.timer(func.__name__):
+                return await func(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        start_time = time.time()
-        result = func(*args, **kwargs)
-        elapsed_time = time.time() - start_time
-        metrics[func.__name__].append(elapsed_time)
-        return result
+        with metrics.timer(func.__name__):
+            return func(*args, **kwargs)
     return wrapper
 
+def validate_results(results):
+    """Return True if results (all or some of the keys) match SCHEMA."""
+    try:
+        validate(instance=results, schema=SCHEMA)
+        return True
+    except ValidationError as e:
+        logging.error(f"Results validation failed: {e.message}")
+        return False
+
+def load_page(pool, url):
+    """Check a driver out of a pool and load the URL in it; return the driver and a snapshot of the page."""
+    driver = pool.acquire()
+    try:
+        with metrics.timer('page_load', backend=pool.name):
+            driver.get(url)
+        return driver, PageSnapshot.from_driver(driver)
+    except Exception:
+        pool.release(driver)
+        raise
+
 @track_metrics
-async def analyze_url(url, args):
-    """Analyze a single URL."""
+async def analyze_url(url, args, driver_pool, stages, resources, sink, http_pool=None, journal=None):
+    """Analyze a single URL, streaming each stage's findings to the results sink.
+
+    The page is loaded in a browser from ``driver_pool`` or, per ``args.backend``,
+    over plain HTTP with a driver from ``http_pool``; in ``auto`` mode pages
+    that turn out to need JavaScript are loaded again in a browser. Stages the
+    ``journal`` already records as finished for the URL are skipped, and each
+    stage that finishes is recorded there.
+
+    Returns the writer's summary (file, finding counts and errors) rather than
+    the findings, so nothing accumulates in memory across URLs.
+    """
+    job_url = url
     url = ensure_url_scheme(url)
     logging.info(f"Using URL: {url}")
+    # HTTP requests of this job carry only this URL's cookies, imported from its driver
+    reset_cookies()
+    if journal is not None:
+        completed = journal.completed_stages(job_url)
+        if completed:
+            logging.info(f"Skipping stages already finished for {url}: {', '.join(sorted(completed))}")
+            stages = [stage for stage in stages if stage.name not in completed]
 
     base_domain = urlparse(url).netloc
-    results = {
-        'input_fields': [],
-        'network_requests': [],
-        'hidden_parameters': {},
-        'js_files': [],
-        'reflected_values': [],
-        'errors': []
-    }
-
-    try:
-        logging.info("Setting up Selenium to fetch JavaScript-rendered content...")
-        driver = setup_selenium(url)
-        if not driver:
-            results['errors'].append("Failed to set up Selenium.")
-            return results
-
-        if args.input_fields:
-            logging.info("Extracting input fields from the page...")
-            try:
-                results['input_fields'] = extract_input_fields(driver)
-            except Exception as e:
-                results['errors'].append(f"Error extracting input fields: {e}")
-
-        if args.network_requests:
-            logging.info("Analyzing network requests...")
-            try:
-                results['network_requests'] = analyze_network_requests(driver, base_domain)
-            except Exception as e:
-                results['errors'].append(f"Error analyzing network requests: {e}")
-
-        if args.hidden_parameters:
-            logging.info("Extracting hidden parameters...")
-            try:
-                results['hidden_parameters'] = extract_hidden_parameters(driver)
-            except Exception as e:
-                results['errors'].append(f"Error extracting hidden parameters: {e}")
-
-        if args.js_files:
-            logging.info("Searching JavaScript files for parameters...")
-            try:
-                results['js_files'] = await search_js_files(driver, url, base_domain)
-            except Exception as e:
-                results['errors'].append(f"Error searching JavaScript files: {e}")
-
-        if args.reflected_values:
-            logging.info("Testing for reflected values using 'MrColonel'...")
-            try:
-                results['reflected_values'] = test_reflected_values(driver, base_domain)
-            except Exception as e:
-                results['errors'].append(f"Error testing reflected values: {e}")
-
-        if args.crawl:
-            logging.info("Crawling the website to discover additional pages...")
+    backend = getattr(args, 'backend', 'browser')
+    pool = driver_pool
+    if http_pool is not None and (backend == 'http' or (backend == 'auto' and not needs_browser(stages, args))):
+        pool = http_pool
+    driver = None
+    with sink.open(url) as writer:
+        try:
+            logging.info(f"Loading the page with a driver from the {pool.name} pool...")
             try:
-                visited_urls = crawl_website(driver, url, base_domain, max_depth=args.crawl_depth)
-                logging.info(f"Visited URLs: {visited_urls}")
+                driver, snapshot = load_page(pool, url)
+                if backend == 'auto' and pool is http_pool and needs_js_rendering(snapshot):
+                    logging.info(f"{url} needs JavaScript rendering; loading it in a browser...")
+                    metrics.count('js_render_escalations')
+                    pool.release(driver)
+                    driver, pool = None, driver_pool
+                    driver, snapshot = load_page(pool, url)
             except Exception as e:
-                results['errors'].append(f"Error crawling website: {e}")
-
-    finally:
-        if driver:
-            driver.quit()
-
-    if validate_results(results):
-        save_results_to_json(results, base_domain)
-    else:
-        logging.error("Results validation failed. Not saving to JSON.")
-
-    return results
-
-async def main():
+                logging.error(f"Error loading {url} with the {pool.name} backend: {e}")
+                writer.error("Failed to set up Selenium." if pool is driver_pool else "Failed to load the page over HTTP.")
+                metrics.count('urls', result='failed')
+                return writer.summary()
+
+            # Share the one parse of the loaded page with every stage
+            context = StageContext(url, base_domain, driver, snapshot, args, resources, writer.path)
+
+            for stage in stages:
+                logging.info(stage.message)
+                try:
+                    with metrics.timer('stage', stage=stage.name):
+                        result = await stage.run(context)
+                except Exception as e:
+                    writer.error(f"Error {stage.action}: {e}")
+                    metrics.count('stage_errors', stage=stage.name)
+                    continue
+                if stage.result_key:
+                    if not validate_results({stage.result_key: result}):
+                        writer.error(f"Invalid {stage.result_key} results; not saved.")
+                        continue
+                    writer.stage(stage.result_key, result)
+                if journal is not None:
+                    journal.stage_done(job_url, stage.name, writer.path)
+
+        finally:
+            if driver:
+                pool.release(driver)
+
+    metrics.count('urls', result='errors' if writer.errors else 'ok')
+    return writer.summary()
+
+def main():
     parser = argparse.ArgumentParser(description="Analyze a website for input fields, network requests, hidden parameters, and reflected values.")
     parser.add_argument('-u', '--url', required=True, help="Input [Filename | URL]")
     parser.add_argument('--input-fields', action='store_true', help="Extract input fields from the page.")
     parser.add_argument('--network-requests', action='store_true', help="Analyze network requests.")
     parser.add_argument('--hidden-parameters', action='store_true', help="Extract hidden parameters.")
+    parser.add_argument('--discover-params', metavar='WORDLIST', help="Brute-force unlinked parameters from a wordlist, one name per line.")
+    parser.add_argument('--discover-method', choices=['GET', 'POST'], default='GET', help="How candidate parameters are sent (default: GET).")
+    parser.add_argument('--discover-batch-size', type=int, default=256, help="Candidate names packed into one request (default: 256).")
     parser.add_argument('--js-files', action='store_true', help="Search JavaScript files for parameters.")
     parser.add_argument('--reflected-values', action='store_true', help="Test for reflected values.")
+    parser.add_argument('--reflect-concurrency', type=int, default=20, help="Reflection probes in flight at once (default: 20).")
+    parser.add_argument('--reflect-dom', action='store_true', help="Also load unreflected GET probes in the browser to catch DOM-based reflection.")
     parser.add_argument('--crawl', action='store_true', help="Crawl the website to discover additional pages.")
     parser.add_argument('--crawl-depth', type=int, default=2, help="Maximum depth for crawling (default: 2).")
+    parser.add_argument('--crawl-max-pages', type=int, default=500, help="Maximum number of pages fetched per crawl (default: 500).")
+    parser.add_argument('--crawl-fetchers', type=int, default=16, help="Concurrent HTTP fetchers used by the crawler (default: 16).")
+    parser.add_argument('--crawl-visited', choices=['auto', 'exact', 'hashed', 'bloom'], default='auto', help="Visited-URL set used to deduplicate crawl links (default: auto).")
+    parser.add_argument('--js-cache-dir', default=".cache/js", help="Directory of the persistent JavaScript cache (default: .cache/js).")
+    parser.add_argument('--js-cache-size', type=int, default=512, help="Maximum size of the JavaScript cache in MB (default: 512).")
+    parser.add_argument('--no-js-cache', action='store_true', help="Download and analyze every script on every run.")
+    parser.add_argument('--js-max-size', type=int, default=20, help="Stop downloading a script after this many MB (default: 20).")
+    parser.add_argument('--js-workers', type=int, default=None, help="Processes analyzing JavaScript; 0 analyzes in-process on a thread (default: one per CPU).")
+    parser.add_argument('-o', '--output-dir', default="results", help="Directory for the per-URL JSON Lines result files (default: results).")
+    parser.add_argument('--compress', choices=['none', 'gzip', 'zstd'], default='none', help="Compress result files; zstd needs the zstandard package (default: none).")
+    parser.add_argument('--backend', choices=BACKENDS, default='auto', help="How pages are loaded: 'browser' (headless Chrome), 'http' (plain HTTP, no JavaScript) or 'auto' (HTTP, switching to the browser for pages and stages that need it) (default: auto).")
+    parser.add_argument('--journal', default=None, help="SQLite job journal recording each URL's state and finished stages (default: <output dir>/journal.sqlite).")
+    parser.add_argument('--resume', action='store_true', help="Continue the journaled run: skip finished URLs and stages, retry failed URLs.")
+    parser.add_argument('--max-attempts', type=int, default=3, help="With --resume, give up on a URL after this many failed attempts (default: 3).")
+    parser.add_argument('--workers', type=int, default=1, help="Number of URLs analyzed in parallel (default: 1).")
+    parser.add_argument('--max-per-host', type=int, default=2, help="Maximum URLs in flight against one host (default: 2).")
+    parser.add_argument('--pool-size', type=int, default=None, help="Number of warm browsers kept in the driver pool (default: --workers).")
+    parser.add_argument('--max-jobs-per-driver', type=int, default=50, help="Recycle a browser after this many URLs (default: 50).")
     args = parser.parse_args()
 
+    # URL lists are read line by line as workers free up, never held in memory
     if args.url.endswith('.txt'):
-        with open(args.url, 'r') as file:
-            urls = file.read().splitlines()
+        urls = read_urls(args.url)
     else:
         urls = [args.url]
 
-    tasks = [analyze_url(url, args) for url in urls]
-    results = await asyncio.gather(*tasks)
+    journal = JobJournal(args.journal or os.path.join(args.output_dir, "journal.sqlite"), args.max_attempts)
+    if args.resume:
+        logging.info(f"Resuming from {journal.path}: {journal.stats()}")
+
+        def skipped(url, reason):
+            logging.info(f"Skipping {url}: {reason}")
+            metrics.count('urls_skipped', reason=reason)
 
-    for result in results:
-        logging.info(f"Results for {result.get('url')}: {result}")
+        urls = journal.pending(urls, skipped)
+    else:
+        journal.reset()
+
+    sink = ResultsSink(args.output_dir, None if args.compress == 'none' else args.compress)
+
+    # Only the enabled stages import their modules and dependencies
+    stages = enabled_stages(args)
+    resources = setup_stages(stages, args)
+    driver_pool = DriverPool(size=args.pool_size or args.workers, max_jobs=args.max_jobs_per_driver)
+    # Browsers are launched lazily, so a scan that never escalates never starts one
+    http_pool = None if args.backend == 'browser' else DriverPool(size=args.workers, max_jobs=args.max_jobs_per_driver,
+                                                                  factory=HttpDriver, name='http')
+    scheduler = ScanScheduler(workers=args.workers, max_per_host=args.max_per_host)
+
+    def job(url):
+        journal.start(url)
+        try:
+            summary = run_in_worker_loop(analyze_url(url, args, driver_pool, stages, resources, sink, http_pool, journal))
+        except Exception as e:
+            journal.finish(url, error=str(e))
+            raise
+        journal.finish(url, error="; ".join(summary['errors']) or None, result_path=summary['path'])
+        return summary
+
+    try:
+        for url, result in scheduler.run(urls, job):
+            logging.info(f"Results for {url}: {result}")
+    finally:
+        close_worker_loops()
+        close_session()
+        driver_pool.close()
+        if http_pool:
+            http_pool.close()
+        teardown_stages(stages, args, resources)
+        logging.info(f"Driver pool: {driver_pool.report()}")
+        logging.info(f"Job journal {journal.path}: {journal.stats()}")
+        journal.close()
+        json_path, prometheus_path = metrics.write(args.output_dir)
+        logging.info(f"Metrics written to {json_path} and {prometheus_path}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    main()
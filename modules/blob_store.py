@@ -0,0 +1,38 @@
+import os
+import hashlib
+from modules.metrics import metrics
+from modules.utils import write_atomic
+
+class BlobStore:
+    """Content-addressed directory of captured bodies too large or too binary to inline in results.
+
+    Each body is stored once as ``<directory>/<sha256>`` however many
+    requests carried it; results refer to it by hash.
+    """
+
+    def __init__(self, directory="results/blobs"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.stored = 0
+        self.deduplicated = 0
+
+    def put(self, data, content_hash=None):
+        """Store a body unless an identical one is already stored; return its sha256."""
+        content_hash = content_hash or hashlib.sha256(data).hexdigest()
+        path = self.path(content_hash)
+        if os.path.exists(path):
+            self.deduplicated += 1
+            metrics.cache('blob', True)
+            return content_hash
+        write_atomic(path, data)
+        self.stored += 1
+        metrics.cache('blob', False)
+        return content_hash
+
+    def path(self, content_hash):
+        """Return the file holding a stored body."""
+        return os.path.join(self.directory, content_hash)
+
+    def stats(self):
+        """Return counts of bodies written and of bodies that were already stored."""
+        return {'stored': self.stored, 'deduplicated': self.deduplicated}
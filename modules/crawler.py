@@ -1,61 +1,51 @@
-import time
 import re
+import threading
 import concurrent.futures
 import urllib.robotparser
-import requests
-from bs4 import BeautifulSoup
+from collections import deque
 from urllib.parse import urljoin, urlparse
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from modules.page_snapshot import PageSnapshot
+from modules.url_canonicalizer import default_canonicalizer
+from modules.visited_set import VisitedSet
+from modules.http_client import get_session, import_driver_cookies
+from modules.drivers import needs_js_rendering, supports_javascript
 
-def extract_links(soup, base_url):
+def extract_links(snapshot, base_url):
     """Extract all types of links from the page."""
     links = set()
 
-    # Extract <a> tags
-    for link in soup.find_all('a', href=True):
-        full_url = urljoin(base_url, link['href'])
-        links.add(full_url)
-
-    # Extract <form> actions
-    for form in soup.find_all('form', action=True):
-        full_url = urljoin(base_url, form['action'])
-        links.add(full_url)
-
-    # Extract <iframe> sources
-    for iframe in soup.find_all('iframe', src=True):
-        full_url = urljoin(base_url, iframe['src'])
-        links.add(full_url)
-
-    # Extract <link> tags (e.g., stylesheets, favicons)
-    for link_tag in soup.find_all('link', href=True):
-        full_url = urljoin(base_url, link_tag['href'])
+    # Extract <a>, <form action>, <iframe> and <link> references
+    for reference in snapshot.links:
+        full_url = urljoin(base_url, reference)
         links.add(full_url)
 
     # Extract JavaScript and CSS files
-    for script in soup.find_all('script', src=True):
-        full_url = urljoin(base_url, script['src'])
-        links.add(full_url)
-    for style in soup.find_all('style'):
+    for script in snapshot.scripts:
+        if script.has_attr('src'):
+            full_url = urljoin(base_url, script['src'])
+            links.add(full_url)
+    for style in snapshot.tags('style'):
         # Parse CSS for @import rules
-        imports = re.findall(r'@import\s+["\'](.*?)["\']', style.string)
+        imports = re.findall(r'@import\s+["\'](.*?)["\']', style.string or "")
         for imp in imports:
             full_url = urljoin(base_url, imp)
             links.add(full_url)
 
     return links
 
-def extract_js_links(driver):
+def extract_js_links(driver, snapshot=None):
     """Extract links generated by JavaScript."""
     js_links = set()
 
-    # Execute JavaScript to find dynamically generated links
-    scripts = driver.find_elements(By.TAG_NAME, "script")
-    for script in scripts:
+    # Script bodies come from the batched DOM collection, not one round trip per tag
+    snapshot = snapshot or PageSnapshot.from_driver(driver)
+    for script in snapshot.dom['scripts']:
         try:
             # Example: Extract links from JavaScript variables
-            js_code = script.get_attribute("innerHTML")
+            js_code = script['code']
             links = re.findall(r'https?://[^\s\'"]+', js_code)
             for link in links:
                 js_links.add(link)
@@ -76,62 +66,106 @@ def is_allowed(rp, url, user_agent="*"):
     return rp.can_fetch(user_agent, url)
 
 def maintain_session(driver):
-    """Maintain session cookies."""
-    cookies = driver.get_cookies()
-    session = requests.Session()
-    for cookie in cookies:
-        session.cookies.set(cookie['name'], cookie['value'])
-    return session
-
-def crawl_page(driver, url, base_url, base_domain, max_depth, visited_urls):
-    """Crawl a single page."""
-    if url in visited_urls:
-        return visited_urls
-    visited_urls.add(url)
-
-    try:
-        driver.get(url)
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-
-        # Extract links
-        links = extract_links(soup, base_url)
-        js_links = extract_js_links(driver)
-        links.update(js_links)
-
-        # Filter links by domain
-        links = [link for link in links if urlparse(link).netloc == base_domain]
-
-        # Limit the number of links to process (e.g., first 10 links)
-        links = list(links)[:10]
-
-        # Recursively crawl links
-        if max_depth > 0:
-            for link in links:
-                if link not in visited_urls:
-                    visited_urls = crawl_page(driver, link, base_url, base_domain, max_depth - 1, visited_urls)
-                    time.sleep(0.125)  # Delay to achieve 8 requests per second (1/8 = 0.125 seconds)
-    except Exception as e:
-        print(f"Error crawling {url}: {e}")
+    """Return the shared HTTP session carrying the browser's session cookies."""
+    return import_driver_cookies(driver, get_session())
+
+def fetch_page(session, url, timeout=10):
+    """Fetch a URL over HTTP; return a PageSnapshot for HTML responses, else None."""
+    with session.get(url, timeout=timeout, stream=True) as response:
+        content_type = response.headers.get('Content-Type', '')
+        if 'html' not in content_type:
+            return None
+        return PageSnapshot(response.text, response.url)
+
+def render_page(driver, url):
+    """Load a URL in the browser and snapshot the rendered DOM."""
+    driver.get(url)
+    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+    return PageSnapshot.from_driver(driver)
+
+def crawl_frontier(base_url, base_domain, driver=None, max_depth=2, max_pages=500, fetchers=16, rp=None, session=None,
+                   canonicalizer=default_canonicalizer, seen=None):
+    """Breadth-first crawl with concurrent HTTP fetchers and browser escalation.
+
+    Pages are fetched over a pooled HTTP session; only pages that look
+    client-rendered are re-loaded in ``driver`` (one at a time, since a
+    driver is not thread-safe), and only if it is a browser. At most ``max_pages`` URLs are fetched.
+    Discovered links are deduplicated on their canonical form in ``seen``,
+    a VisitedSet, so the frontier never holds two spellings of one URL; the
+    URL fetched is the first spelling found, exactly as the site linked it.
+    """
+    if session is None:
+        session = maintain_session(driver) if driver else get_session()
+    driver_lock = threading.Lock()
+
+    def visit(url):
+        snapshot = fetch_page(session, url)
+        if snapshot is None:
+            return set()
+        if driver is not None and supports_javascript(driver) and needs_js_rendering(snapshot):
+            with driver_lock:
+                snapshot = render_page(driver, url)
+        links = extract_links(snapshot, snapshot.url)
+        links.update(extract_js_links(driver, snapshot))
+        return links
+
+    base_domain = base_domain.lower()
+    if seen is None:
+        seen = VisitedSet()
+    seen.add(canonicalizer(base_url))
+    visited_urls = set()
+    frontier = deque([(base_url, 0)])
+    in_flight = {}
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=fetchers) as executor:
+        while frontier or in_flight:
+            while frontier and len(in_flight) < fetchers and len(visited_urls) < max_pages:
+                url, depth = frontier.popleft()
+                if rp is not None and not is_allowed(rp, url):
+                    continue
+                visited_urls.add(url)
+                in_flight[executor.submit(visit, url)] = (url, depth)
+
+            if not in_flight:
+                break
+
+            done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                url, depth = in_flight.pop(future)
+                try:
+                    links = future.result()
+                except Exception as e:
+                    print(f"Error crawling {url}: {e}")
+                    continue
+                if depth >= max_depth:
+                    continue
+                for link in links:
+                    # The canonical form is only the deduplication key
+                    canonical = canonicalizer(link)
+                    parsed = urlparse(canonical)
+                    if parsed.scheme in ('http', 'https') and parsed.netloc == base_domain and seen.add(canonical):
+                        frontier.append((link, depth + 1))
 
     return visited_urls
 
-def crawl_website(driver, base_url, base_domain, max_depth=2):
-    """Crawl the website to discover additional pages and resources."""
+def crawl_website(driver, base_url, base_domain, max_depth=2, max_pages=500, fetchers=16, visited_mode='auto',
+                  sitemap_path="sitemap.txt"):
+    """Crawl the website to discover additional pages and resources, writing them to ``sitemap_path``."""
     visited_urls = set()
     rp = check_robots_txt(base_url)
 
     # Start crawling from the base URL
     if is_allowed(rp, base_url):
-        visited_urls = crawl_page(driver, base_url, base_url, base_domain, max_depth, visited_urls)
+        seen = VisitedSet(visited_mode, capacity=max(max_pages * 100, 100000))
+        visited_urls = crawl_frontier(base_url, base_domain, driver, max_depth, max_pages, fetchers, rp, seen=seen)
 
     # Generate a sitemap
-    generate_sitemap(visited_urls)
+    generate_sitemap(visited_urls, sitemap_path)
 
     return visited_urls
 
-def generate_sitemap(visited_urls):
+def generate_sitemap(visited_urls, path="sitemap.txt"):
     """Generate a sitemap of the crawled URLs."""
-    with open("sitemap.txt", "w") as f:
-        for url in visited_urls:
+    with open(path, "w") as f:
+        for url in sorted(visited_urls):
             f.write(f"{url}\n")
\ No newline at end of file
@@ -0,0 +1,64 @@
+import json
+from urllib.parse import urljoin
+
+# One round trip that returns everything the analyzers read from the live DOM.
+# Values use DOM properties (like WebElement.get_attribute) so that inputs
+# reflect what scripts and the user have set, not just the original markup.
+COLLECT_DOM_SCRIPT = r"""
+function storage(area) {
+    var out = {};
+    try {
+        for (var i = 0; i < area.length; i++) {
+            var key = area.key(i);
+            out[key] = area.getItem(key);
+        }
+    } catch (e) {}
+    return out;
+}
+var map = Array.prototype.map;
+var doctype = document.doctype ? new XMLSerializer().serializeToString(document.doctype) : '';
+return JSON.stringify({
+    url: location.href,
+    source: doctype + document.documentElement.outerHTML,
+    inputs: map.call(document.getElementsByTagName('input'), function (el) {
+        return {type: el.type, name: el.name, id: el.id, placeholder: el.placeholder, value: el.value};
+    }),
+    scripts: map.call(document.getElementsByTagName('script'), function (el) {
+        return {src: el.src, code: el.innerHTML};
+    }),
+    forms: map.call(document.forms, function (el) {
+        return {id: el.id, action: el.getAttribute('action'), method: el.getAttribute('method')};
+    }),
+    local_storage: storage(window.localStorage),
+    session_storage: storage(window.sessionStorage)
+});
+"""
+
+def collect_dom(driver):
+    """Pull page source, inputs, scripts, forms and web storage in a single execute_script call."""
+    return json.loads(driver.execute_script(COLLECT_DOM_SCRIPT))
+
+def dom_from_snapshot(snapshot):
+    """Build the same structure as collect_dom from a parsed page, for snapshots without a live DOM."""
+    return {
+        'url': snapshot.url,
+        'source': snapshot.source,
+        'inputs': [{
+            'type': tag.get('type', 'text'),
+            'name': tag.get('name', ''),
+            'id': tag.get('id', ''),
+            'placeholder': tag.get('placeholder', ''),
+            'value': tag.get('value', '')
+        } for tag in snapshot.inputs],
+        'scripts': [{
+            'src': urljoin(snapshot.url, tag['src']) if tag.has_attr('src') else '',
+            'code': tag.string or ''
+        } for tag in snapshot.scripts],
+        'forms': [{
+            'id': tag.get('id', ''),
+            'action': tag.get('action'),
+            'method': tag.get('method')
+        } for tag in snapshot.forms],
+        'local_storage': {},
+        'session_storage': {}
+    }
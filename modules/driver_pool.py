@@ -0,0 +1,153 @@
+import logging
+import threading
+from contextlib import contextmanager
+from modules.metrics import metrics, instrument_driver
+
+def _create_driver():
+    # selenium-wire is imported on the first browser launch, not at startup
+    from modules.selenium_setup import create_driver
+    return instrument_driver(create_driver())
+
+class DriverPool:
+    """A fixed-size pool of warm WebDriver instances shared across scan jobs.
+
+    Drivers are created lazily up to ``size``, handed out one job at a time,
+    reset between jobs and replaced after ``max_jobs`` uses or when they stop
+    responding. ``factory`` makes the drivers (a browser by default); ``name``
+    labels the pool's metrics.
+    """
+
+    def __init__(self, size=1, max_jobs=50, factory=None, name='browser'):
+        if size < 1:
+            raise ValueError("Driver pool size must be at least 1.")
+        self.size = size
+        self.max_jobs = max_jobs
+        self._factory = factory or _create_driver
+        self.name = name
+        self._idle = []
+        self._jobs = {}
+        self._live = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self.stats = {'created': 0, 'reused': 0, 'recycled': 0, 'crashed': 0}
+
+    def acquire(self, timeout=None):
+        """Return a warm driver, creating one if the pool is not yet full."""
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Driver pool is closed.")
+                if self._idle:
+                    driver = self._idle.pop()
+                    self.stats['reused'] += 1
+                    self._record_levels()
+                    return driver
+                if self._live < self.size:
+                    self._live += 1
+                    break
+                if not self._cond.wait(timeout):
+                    raise TimeoutError("Timed out waiting for a free driver.")
+
+        try:
+            driver = self._factory()
+        except Exception:
+            with self._cond:
+                self._live -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self.stats['created'] += 1
+            self._jobs[id(driver)] = 0
+            self._record_levels()
+        return driver
+
+    def release(self, driver, broken=False):
+        """Return a driver to the pool, recycling it when it is worn out or broken."""
+        with self._cond:
+            jobs = self._jobs.get(id(driver), 0) + 1
+            self._jobs[id(driver)] = jobs
+            if broken:
+                self.stats['crashed'] += 1
+            elif jobs >= self.max_jobs:
+                self.stats['recycled'] += 1
+
+        if not broken and jobs < self.max_jobs and not self._closed:
+            if reset_driver(driver):
+                with self._cond:
+                    self._idle.append(driver)
+                    self._record_levels()
+                    self._cond.notify()
+                return
+            with self._cond:
+                self.stats['crashed'] += 1
+
+        self._discard(driver)
+
+    @contextmanager
+    def driver(self):
+        """Context manager that checks a driver out for the duration of one job."""
+        driver = self.acquire()
+        broken = False
+        try:
+            yield driver
+        except Exception:
+            broken = not is_alive(driver)
+            raise
+        finally:
+            self.release(driver, broken=broken)
+
+    def close(self):
+        """Quit every idle driver and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for driver in idle:
+            self._discard(driver)
+
+    def _record_levels(self):
+        # Caller holds self._cond
+        metrics.gauge('driver_pool_idle', len(self._idle), pool=self.name)
+        metrics.gauge('driver_pool_live', self._live, pool=self.name)
+
+    def report(self):
+        """Return pool usage counters."""
+        with self._cond:
+            return dict(self.stats, size=self.size, live=self._live, idle=len(self._idle))
+
+    def _discard(self, driver):
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.warning(f"Error quitting driver: {e}")
+        with self._cond:
+            self._jobs.pop(id(driver), None)
+            self._live -= 1
+            self._record_levels()
+            self._cond.notify()
+
+def is_alive(driver):
+    """Check whether the browser behind a driver still answers commands."""
+    try:
+        driver.current_url
+        return True
+    except Exception:
+        return False
+
+def reset_driver(driver):
+    """Clear cookies, web storage and captured traffic so the next job starts clean."""
+    try:
+        try:
+            driver.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': '*', 'storageTypes': 'all'})
+        except Exception:
+            driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+        driver.delete_all_cookies()
+        driver.get("about:blank")
+        del driver.requests
+        # A traffic monitor left running must not see the next job's requests
+        if getattr(driver, 'response_interceptor', None) is not None:
+            del driver.response_interceptor
+        return True
+    except Exception as e:
+        logging.warning(f"Error resetting driver, recycling it: {e}")
+        return False
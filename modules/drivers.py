@@ -0,0 +1,179 @@
+import re
+from modules.http_client import create_pooled_session
+
+# Backends --backend can choose from
+BACKENDS = ('auto', 'browser', 'http')
+
+class Driver:
+    """What the analysis modules use of a driver.
+
+    The selenium-wire Chrome driver provides all of it; HttpDriver provides
+    it over plain HTTP. Modules must not rely on anything else.
+
+        get(url)                load a page
+        page_source             HTML of the loaded page
+        current_url             URL of the loaded page, after redirects
+        get_cookies()           [{'name', 'value', 'domain', 'path', ...}]
+        delete_all_cookies()
+        requests                captured traffic: objects with method, url, headers,
+                                body and response (status_code, headers, body);
+                                ``del driver.requests`` clears it
+        response_interceptor    optional callable(request, response) run per response
+        execute_script(script)  run JavaScript; raises if the backend has no engine
+        execute_cdp_cmd(cmd, params)
+        find_element(by, value) raises NoSuchElementException when absent
+        quit()
+
+    ``supports_javascript`` is False on backends without a script engine;
+    drivers that do not define it are assumed to have one.
+    """
+
+    supports_javascript = True
+
+def supports_javascript(driver):
+    """Return True if a driver runs page scripts (a real browser)."""
+    return getattr(driver, 'supports_javascript', True)
+
+# Markers of client-rendered shells whose links only exist after scripts run
+SPA_MOUNT_POINTS = re.compile(r'<div[^>]+id=["\'](?:root|app|__next|__nuxt)["\'][^>]*>\s*</div>|ng-app|data-reactroot', re.I)
+
+def needs_js_rendering(snapshot, min_text_length=200):
+    """Guess whether a page fetched over plain HTTP has to be rendered in a browser."""
+    if snapshot.soup.body is None:
+        return bool(snapshot.scripts)
+    if SPA_MOUNT_POINTS.search(snapshot.source):
+        return True
+    for noscript in snapshot.soup.find_all('noscript'):
+        if 'javascript' in noscript.get_text().lower():
+            return True
+    text_length = len(snapshot.soup.body.get_text(strip=True))
+    return text_length < min_text_length and len(snapshot.scripts) > 0
+
+class CapturedResponse:
+    def __init__(self, status_code, reason, headers, body):
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+class CapturedRequest:
+    def __init__(self, method, url, headers, body, response=None):
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.body = body
+        self.response = response
+
+class HttpDriver(Driver):
+    """Driver backend that loads pages with plain HTTP and answers element lookups with lxml.
+
+    No browser, no proxy and no script engine: execute_script raises, so
+    PageSnapshot parses the page source instead of collecting the live DOM,
+    and ``requests`` holds only the documents the driver loaded. Suited to
+    static pages; see needs_js_rendering for telling them apart.
+
+    With ``pages`` ({url: html} or {url: (status, headers, body)}) nothing
+    goes over the network, which makes it a test double for the other
+    modules; unknown URLs get a 404.
+    """
+
+    supports_javascript = False
+    # A class default so reset_driver can delete an instance's interceptor
+    response_interceptor = None
+
+    def __init__(self, session=None, pages=None, timeout=30):
+        # Drivers share the scanner's connection pool but each keeps its own cookies
+        self._owns_session = session is not None
+        self.session = session if session is not None else create_pooled_session()
+        self.pages = pages
+        self.timeout = timeout
+        self.current_url = "about:blank"
+        self.page_source = ""
+        self._requests = []
+        self._tree = None
+
+    @property
+    def requests(self):
+        return list(self._requests)
+
+    @requests.deleter
+    def requests(self):
+        self._requests = []
+
+    def get(self, url):
+        """Load a URL, following redirects, and record the exchange."""
+        self._tree = None
+        if url == "about:blank":
+            self.current_url, self.page_source = url, ""
+            return
+        if self.pages is not None:
+            status, headers, body = self._page(url)
+            request = CapturedRequest('GET', url, {}, b"", CapturedResponse(status, "", headers, body))
+            self.current_url, self.page_source = url, body.decode('utf-8', errors='replace')
+        else:
+            response = self.session.get(url, timeout=self.timeout)
+            sent = response.request
+            request = CapturedRequest('GET', sent.url, dict(sent.headers), b"",
+                                      CapturedResponse(response.status_code, response.reason, dict(response.headers), response.content))
+            self.current_url, self.page_source = response.url, response.text
+        self.record(request)
+
+    def record(self, request):
+        """Add a request to the captured traffic and pass it to the response interceptor."""
+        self._requests.append(request)
+        if self.response_interceptor is not None and request.response is not None:
+            self.response_interceptor(request, request.response)
+
+    def execute_script(self, script, *args):
+        raise NotImplementedError("HttpDriver does not run JavaScript")
+
+    def execute_cdp_cmd(self, command, params):
+        # There is no web storage to clear
+        return {}
+
+    def find_element(self, by, value):
+        """Return the first matching lxml element for 'tag name', 'id', 'name' or 'xpath' lookups."""
+        from selenium.common.exceptions import NoSuchElementException
+        if self._tree is None:
+            import lxml.html
+            self._tree = lxml.html.fromstring(self.page_source or "<html></html>")
+        xpaths = {
+            'tag name': f"//{value}",
+            'id': f"//*[@id='{value}']",
+            'name': f"//*[@name='{value}']",
+            'xpath': value,
+        }
+        if by not in xpaths:
+            raise NotImplementedError(f"HttpDriver cannot find elements by {by}")
+        found = self._tree.xpath(xpaths[by])
+        if not found:
+            raise NoSuchElementException(f"No element {by}={value}")
+        return found[0]
+
+    def get_cookies(self):
+        if self.pages is not None:
+            return []
+        return [{'name': cookie.name, 'value': cookie.value, 'domain': cookie.domain, 'path': cookie.path,
+                 'secure': cookie.secure, 'httpOnly': cookie.has_nonstandard_attr('HttpOnly')}
+                for cookie in self.session.cookies]
+
+    def delete_all_cookies(self):
+        self.session.cookies.clear()
+
+    def quit(self):
+        if self._owns_session:
+            self.session.close()
+        else:
+            # Closing would close the shared connection pool
+            self.session.cookies.clear()
+
+    def _page(self, url):
+        page = self.pages.get(url)
+        if page is None:
+            page = self.pages.get(url[:-1] if url.endswith("/") else url + "/")
+        if page is None:
+            return 404, {'Content-Type': 'text/html'}, b"<html><body>Not found</body></html>"
+        if isinstance(page, str):
+            return 200, {'Content-Type': 'text/html; charset=utf-8'}, page.encode('utf-8')
+        status, headers, body = page
+        return status, headers, body.encode('utf-8') if isinstance(body, str) else body
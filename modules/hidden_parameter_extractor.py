@@ -1,27 +1,27 @@
-from bs4 import BeautifulSoup
-from urllib.parse import parse_qs, urlparse
+from urllib.parse import parse_qs, parse_qsl, urlparse, urlsplit, urlunsplit, urlencode, quote_plus
 import re
 import json
-from selenium.webdriver.common.by import By
+import asyncio
+import secrets
+from modules.page_snapshot import PageSnapshot
+from modules.pattern_engine import get_engine
+from modules.http_client import get_async_session
+from modules.response_fingerprint import BaselineStore
 
-def extract_js_parameters(driver):
+JS_PARAMETER_RULES = ("api_key", "token", "secret")
+
+def extract_js_parameters(driver, snapshot=None):
     """Extract hidden parameters from JavaScript files."""
     js_parameters = {}
     try:
         # Extract all script tags
-        scripts = driver.find_elements(By.TAG_NAME, "script")
-        for script in scripts:
-            js_code = script.get_attribute("innerHTML")
-            # Search for common patterns
-            patterns = {
-                "api_key": r'API_KEY\s*=\s*["\'](.*?)["\']',
-                "token": r'token\s*=\s*["\'](.*?)["\']',
-                "secret": r'secret\s*=\s*["\'](.*?)["\']'
-            }
-            for key, pattern in patterns.items():
-                matches = re.findall(pattern, js_code)
-                if matches:
-                    js_parameters[key] = matches[0]
+        snapshot = snapshot or PageSnapshot.from_driver(driver)
+        engine = get_engine(JS_PARAMETER_RULES)
+        for script in snapshot.dom['scripts']:
+            js_code = script['code']
+            # Search for common patterns, keeping the first hit per rule
+            for key, matches in engine.findall(js_code).items():
+                js_parameters[key] = matches[0]
     except Exception as e:
         print(f"Error extracting JS parameters: {e}")
     return js_parameters
@@ -59,20 +59,20 @@ def extract_json_parameters(driver):
         print(f"Error extracting JSON parameters: {e}")
     return json_parameters
 
-def extract_contextual_parameters(driver):
+def extract_contextual_parameters(driver, snapshot=None):
     """Extract contextual parameters like CSRF tokens."""
     contextual_parameters = {}
     try:
         # Extract CSRF token from meta tags
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        csrf_token = soup.find("meta", attrs={"name": "csrf-token"})
+        snapshot = snapshot or PageSnapshot.from_driver(driver)
+        csrf_token = snapshot.meta("csrf-token")
         if csrf_token:
             contextual_parameters["csrf_token"] = csrf_token.get("content")
     except Exception as e:
         print(f"Error extracting contextual parameters: {e}")
     return contextual_parameters
 
-def extract_hidden_parameters(driver):
+def extract_hidden_parameters(driver, snapshot=None):
     """Extract all hidden parameters."""
     hidden_parameters = {
         'hidden_inputs': [],
@@ -86,8 +86,8 @@ def extract_hidden_parameters(driver):
     }
     try:
         # Extract hidden input fields
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        hidden_inputs = soup.find_all('input', type='hidden')
+        snapshot = snapshot or PageSnapshot.from_driver(driver)
+        hidden_inputs = [tag for tag in snapshot.inputs if tag.get('type') == 'hidden']
         for input_tag in hidden_inputs:
             hidden_parameters['hidden_inputs'].append({
                 'name': input_tag.get('name'),
@@ -105,23 +105,140 @@ def extract_hidden_parameters(driver):
                 'same_site': cookie.get('sameSite', 'None')
             })
 
-        # Extract local storage
-        hidden_parameters['local_storage'] = driver.execute_script("return window.localStorage;")
-
-        # Extract session storage
-        hidden_parameters['session_storage'] = driver.execute_script("return window.sessionStorage;")
+        # Extract local and session storage
+        hidden_parameters['local_storage'] = snapshot.dom['local_storage']
+        hidden_parameters['session_storage'] = snapshot.dom['session_storage']
 
         # Extract JavaScript parameters
-        hidden_parameters['js_parameters'] = extract_js_parameters(driver)
+        hidden_parameters['js_parameters'] = extract_js_parameters(driver, snapshot)
 
         # Extract URL parameters
-        hidden_parameters['url_parameters'] = extract_url_parameters(driver.current_url)
+        hidden_parameters['url_parameters'] = extract_url_parameters(snapshot.url)
 
         # Extract JSON parameters
         hidden_parameters['json_parameters'] = extract_json_parameters(driver)
 
         # Extract contextual parameters
-        hidden_parameters['contextual_parameters'] = extract_contextual_parameters(driver)
+        hidden_parameters['contextual_parameters'] = extract_contextual_parameters(driver, snapshot)
     except Exception as e:
         print(f"Error extracting hidden parameters: {e}")
-    return hidden_parameters
\ No newline at end of file
+    return hidden_parameters
+
+# Candidate names packed into one discovery request, and the query string length kept under
+DISCOVERY_BATCH_SIZE = 256
+DISCOVERY_MAX_QUERY_LENGTH = 6000
+
+def load_wordlist(path):
+    """Read candidate parameter names, one per line, skipping blanks, comments and duplicates."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        names = (line.strip() for line in f)
+        return list(dict.fromkeys(name for name in names if name and not name.startswith('#')))
+
+def batch_names(names, canaries, batch_size=DISCOVERY_BATCH_SIZE, max_query_length=DISCOVERY_MAX_QUERY_LENGTH):
+    """Split names into groups of at most batch_size whose encoded name=canary pairs fit max_query_length."""
+    group, length = [], 0
+    for name in names:
+        size = len(quote_plus(name)) + len(canaries[name]) + 2
+        if group and (len(group) >= batch_size or length + size > max_query_length):
+            yield group
+            group, length = [], 0
+        group.append(name)
+        length += size
+    if group:
+        yield group
+
+async def discover_parameters(url, wordlist, session=None, method='GET', batch_size=DISCOVERY_BATCH_SIZE,
+                              concurrency=10, max_query_length=DISCOVERY_MAX_QUERY_LENGTH):
+    """Find parameters the server accepts but the page never shows, by brute force.
+
+    Hundreds of candidate names are sent per request, each with its own
+    canary value. A canary in the response proves that name is reflected.
+    A response that is not the baseline page (see BaselineStore; echoed
+    name=canary pairs are removed first) means some name in the group
+    changed the page, and the group is bisected until single names remain.
+    The request count is about len(wordlist) / batch_size plus a few per
+    real parameter. GET candidates are merged into the URL's own query
+    string (which counts toward ``max_query_length``); the fragment is
+    dropped, since it never reaches the server.
+
+    Returns:
+        tuple: (parameters, requests) where parameters lists
+        {'name', 'evidence'} dicts, evidence being 'reflected' or
+        'response_changed', and requests is the number of requests sent.
+    """
+    session = session or get_async_session()
+    parts = urlsplit(url)
+    url = urlunsplit(parts._replace(fragment=''))
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if method == 'GET' and parts.query:
+        max_query_length = max(1, max_query_length - len(parts.query) - 1)
+    semaphore = asyncio.Semaphore(concurrency)
+    prefix = "pm" + secrets.token_hex(4)
+    canary_pattern = re.compile(prefix + r"[0-9a-f]{6}")
+    # A name=canary pair as a page may echo it back, e.g. inside a canonical link
+    echo_pattern = re.compile(r"[\w.\-\[\]%]*(?:=|&#61;|%3D)?" + prefix + r"[0-9a-f]{6}(?:&amp;|&|%26)?")
+
+    names = list(dict.fromkeys(wordlist))
+    controls = [secrets.token_hex(4), secrets.token_hex(4)]
+    canaries = {name: f"{prefix}{index:06x}" for index, name in enumerate(names + controls)}
+    by_canary = {canary: name for name, canary in canaries.items()}
+    requests_sent = 0
+
+    async def send(group):
+        nonlocal requests_sent
+        params = [(name, canaries[name]) for name in group]
+        async with semaphore:
+            requests_sent += 1
+            try:
+                if method == 'GET':
+                    # A candidate the page already sends replaces its value instead of repeating it
+                    candidates = set(group)
+                    merged = [(key, value) for key, value in query if key not in candidates] + params
+                    request = session.get(urlunsplit(parts._replace(query=urlencode(merged), fragment='')), timeout=30)
+                else:
+                    request = session.post(url, data=urlencode(params), headers={'Content-Type': 'application/x-www-form-urlencoded'}, timeout=30)
+                async with request as response:
+                    return response.status, await response.text(errors='replace')
+            except Exception as e:
+                print(f"Error probing parameters at {url}: {e}")
+                return None
+
+    # Two requests with one junk parameter each: the baseline, and a check of how stable it is
+    first, second = await send([controls[0]]), await send([controls[1]])
+    if first is None or second is None:
+        return [], requests_sent
+    # If even a junk parameter is reflected the page echoes its whole query; reflection proves nothing
+    echoes_query = canaries[controls[0]] in first[1]
+
+    def strip_echoes(text):
+        return echo_pattern.sub('', text) if prefix in text else text
+
+    baselines = BaselineStore()
+    for status, text in (second, first):
+        baselines.record(url, status, strip_echoes(text))
+
+    def changed(status, text):
+        return not baselines.matches(url, status, strip_echoes(text))
+
+    found = {}
+
+    async def probe(group):
+        result = await send(group)
+        if result is None:
+            return
+        status, text = result
+        if not echoes_query:
+            for match in canary_pattern.finditer(text):
+                name = by_canary.get(match.group())
+                if name in group:
+                    found.setdefault(name, 'reflected')
+        if changed(status, text):
+            if len(group) == 1:
+                found.setdefault(group[0], 'response_changed')
+            else:
+                half = len(group) // 2
+                await asyncio.gather(probe(group[:half]), probe(group[half:]))
+
+    groups = batch_names(names, canaries, batch_size, max_query_length)
+    await asyncio.gather(*(probe(group) for group in groups))
+    return [{'name': name, 'evidence': found[name]} for name in names if name in found], requests_sent
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+import requests
+import requests.adapters
+from urllib.parse import urlsplit
+from modules.metrics import metrics
+
+# Sent with every request the scanner makes, from the browser or over plain HTTP
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36 MrColonel',
+    'X-Researcher-Username': 'mrcolonel'
+}
+
+# Hosts whose keep-alive connections are kept, and connections kept per host
+POOL_CONNECTIONS = 32
+POOL_MAXSIZE = 32
+# Async connection limits and how long resolved addresses are reused (seconds)
+ASYNC_LIMIT = 100
+ASYNC_LIMIT_PER_HOST = 16
+DNS_CACHE_TTL = 300
+
+_adapter = None
+_adapter_lock = threading.Lock()
+_generation = 0
+_local = threading.local()
+_async_sessions = {}
+_async_sessions_lock = threading.Lock()
+
+def _host(url):
+    return urlsplit(str(url)).netloc
+
+def _record_response(response, stream=False, **kwargs):
+    # Response hooks run once per hop, before a non-streamed body is read; reading it
+    # here costs nothing extra. Streamed bodies are counted by their Content-Length.
+    host = _host(response.url)
+    size = int(response.headers.get('Content-Length') or 0) if stream else len(response.content)
+    metrics.count('http_requests', client='requests', host=host, status=response.status_code)
+    metrics.count('http_response_bytes', size, host=host)
+    return response
+
+def _trace_config():
+    import aiohttp
+
+    async def on_request_end(session, context, params):
+        metrics.count('http_requests', client='aiohttp', host=_host(params.url), status=params.response.status)
+
+    async def on_chunk(session, context, params):
+        metrics.count('http_response_bytes', len(params.chunk), host=_host(params.url))
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_response_chunk_received.append(on_chunk)
+    return trace_config
+
+def create_session(adapter=None):
+    """Create a requests session with pooled keep-alive connections and the default headers.
+
+    Sessions given the same ``adapter`` share its connection pool but keep
+    cookie jars of their own.
+    """
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    session.hooks['response'].append(_record_response)
+    if adapter is None:
+        adapter = requests.adapters.HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def _shared_adapter():
+    global _adapter
+    with _adapter_lock:
+        if _adapter is None:
+            _adapter = requests.adapters.HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE)
+        return _adapter, _generation
+
+def create_pooled_session():
+    """Create a requests session on the process-wide connection pool, with a cookie jar of its own.
+
+    Closing it would close the shared pool; drop it instead.
+    """
+    return create_session(_shared_adapter()[0])
+
+def get_session():
+    """Return the calling thread's requests session.
+
+    Every thread's session uses one process-wide connection pool, but the
+    cookie jar is the thread's own: a scan worker runs one URL at a time,
+    so reset_cookies at the start of each job keeps one URL's cookies out
+    of the next and away from other workers.
+    """
+    adapter, generation = _shared_adapter()
+    session = getattr(_local, 'session', None)
+    if session is None or _local.generation != generation:
+        session = create_session(adapter)
+        _local.session, _local.generation = session, generation
+    return session
+
+def close_session():
+    """Close the shared connection pool; threads get new sessions on their next get_session."""
+    global _adapter, _generation
+    with _adapter_lock:
+        adapter, _adapter = _adapter, None
+        _generation += 1
+    if adapter is not None:
+        adapter.close()
+
+def get_async_session():
+    """Return the aiohttp session of the running event loop, creating it on first use.
+
+    aiohttp sessions are bound to the loop they were created on, so each
+    worker loop gets its own; it lives as long as the loop does (see
+    scheduler.run_in_worker_loop) and is closed by close_async_session.
+    reset_cookies empties its cookie jar between URLs.
+    """
+    # Deferred so that runs using only requests never import aiohttp
+    import aiohttp
+
+    loop = asyncio.get_running_loop()
+    with _async_sessions_lock:
+        session = _async_sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(limit=ASYNC_LIMIT, limit_per_host=ASYNC_LIMIT_PER_HOST, ttl_dns_cache=DNS_CACHE_TTL)
+            session = aiohttp.ClientSession(connector=connector, headers=DEFAULT_HEADERS, trace_configs=[_trace_config()])
+            _async_sessions[loop] = session
+        return session
+
+def reset_cookies():
+    """Empty the cookie jars of the calling worker's sessions, before it starts on a new URL.
+
+    Clears the thread's requests session and, when called inside an event
+    loop, that loop's aiohttp session; the pooled connections stay open.
+    """
+    session = getattr(_local, 'session', None)
+    if session is not None:
+        session.cookies.clear()
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    with _async_sessions_lock:
+        async_session = _async_sessions.get(loop)
+    if async_session is not None and not async_session.closed:
+        async_session.cookie_jar.clear()
+
+async def close_async_session():
+    """Close the running loop's aiohttp session, if it has one."""
+    with _async_sessions_lock:
+        session = _async_sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+def import_driver_cookies(driver, session=None):
+    """Copy the browser's cookies into a session so HTTP requests share its login state.
+
+    Args:
+        driver: The WebDriver whose cookies are copied.
+        session: A requests or aiohttp session; defaults to the thread's requests session.
+
+    Returns:
+        The session the cookies were added to.
+    """
+    session = session if session is not None else get_session()
+    for cookie in driver.get_cookies():
+        domain = cookie.get('domain', '')
+        if hasattr(session, 'cookie_jar'):
+            # An aiohttp session; yarl ships with aiohttp
+            from yarl import URL
+            cookie_url = URL(f"https://{domain.lstrip('.')}{cookie.get('path', '/')}")
+            session.cookie_jar.update_cookies({cookie['name']: cookie['value']}, response_url=cookie_url)
+        else:
+            session.cookies.set(cookie['name'], cookie['value'], domain=domain, path=cookie.get('path', '/'))
+    return session
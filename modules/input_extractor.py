@@ -1,12 +1,11 @@
-from bs4 import BeautifulSoup
-from selenium.webdriver.common.by import By
+from modules.page_snapshot import PageSnapshot
 
-def extract_interactive_elements(soup):
+def extract_interactive_elements(snapshot):
     """Extract all interactive elements from the page."""
     interactive_elements = []
 
     # Extract <input> tags
-    for input_tag in soup.find_all('input'):
+    for input_tag in snapshot.tags('input'):
         interactive_elements.append({
             'type': input_tag.get('type', 'text'),
             'name': input_tag.get('name'),
@@ -19,7 +18,7 @@ def extract_interactive_elements(soup):
         })
 
     # Extract <textarea> tags
-    for textarea_tag in soup.find_all('textarea'):
+    for textarea_tag in snapshot.tags('textarea'):
         interactive_elements.append({
             'type': 'textarea',
             'name': textarea_tag.get('name'),
@@ -30,7 +29,7 @@ def extract_interactive_elements(soup):
         })
 
     # Extract <select> tags
-    for select_tag in soup.find_all('select'):
+    for select_tag in snapshot.tags('select'):
         interactive_elements.append({
             'type': 'select',
             'name': select_tag.get('name'),
@@ -39,7 +38,7 @@ def extract_interactive_elements(soup):
         })
 
     # Extract <button> tags
-    for button_tag in soup.find_all('button'):
+    for button_tag in snapshot.tags('button'):
         interactive_elements.append({
             'type': 'button',
             'name': button_tag.get('name'),
@@ -48,7 +47,7 @@ def extract_interactive_elements(soup):
         })
 
     # Extract <datalist> tags
-    for datalist_tag in soup.find_all('datalist'):
+    for datalist_tag in snapshot.tags('datalist'):
         interactive_elements.append({
             'type': 'datalist',
             'id': datalist_tag.get('id'),
@@ -56,7 +55,7 @@ def extract_interactive_elements(soup):
         })
 
     # Extract custom elements (e.g., <div contenteditable>)
-    for custom_tag in soup.find_all(attrs={"contenteditable": True}):
+    for custom_tag in snapshot.editable:
         interactive_elements.append({
             'type': 'custom',
             'id': custom_tag.get('id'),
@@ -65,28 +64,28 @@ def extract_interactive_elements(soup):
 
     return interactive_elements
 
-def extract_dynamic_inputs(driver):
+def extract_dynamic_inputs(driver, snapshot=None):
     """Extract dynamically generated input fields."""
     dynamic_inputs = []
     try:
-        # Execute JavaScript to find dynamically generated inputs
-        inputs = driver.find_elements(By.TAG_NAME, "input")
-        for input_tag in inputs:
+        # Live DOM values were collected in one batched round trip
+        snapshot = snapshot or PageSnapshot.from_driver(driver)
+        for input_tag in snapshot.dom['inputs']:
             dynamic_inputs.append({
-                'type': input_tag.get_attribute('type'),
-                'name': input_tag.get_attribute('name'),
-                'id': input_tag.get_attribute('id'),
-                'placeholder': input_tag.get_attribute('placeholder'),
-                'value': input_tag.get_attribute('value')
+                'type': input_tag['type'],
+                'name': input_tag['name'],
+                'id': input_tag['id'],
+                'placeholder': input_tag['placeholder'],
+                'value': input_tag['value']
             })
     except Exception as e:
         print(f"Error extracting dynamic inputs: {e}")
     return dynamic_inputs
 
-def extract_form_inputs(soup):
+def extract_form_inputs(snapshot):
     """Extract input fields within forms."""
     form_inputs = []
-    for form in soup.find_all('form'):
+    for form in snapshot.forms:
         inputs = form.find_all(['input', 'textarea', 'select'])
         for input_tag in inputs:
             form_inputs.append({
@@ -99,22 +98,22 @@ def extract_form_inputs(soup):
             })
     return form_inputs
 
-def extract_input_fields(driver):
+def extract_input_fields(driver, snapshot=None):
     """Extract all input fields from the page."""
     input_fields = []
     try:
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
+        snapshot = snapshot or PageSnapshot.from_driver(driver)
 
         # Extract interactive elements
-        interactive_elements = extract_interactive_elements(soup)
+        interactive_elements = extract_interactive_elements(snapshot)
         input_fields.extend(interactive_elements)
 
         # Extract dynamic inputs
-        dynamic_inputs = extract_dynamic_inputs(driver)
+        dynamic_inputs = extract_dynamic_inputs(driver, snapshot)
         input_fields.extend(dynamic_inputs)
 
         # Extract form inputs
-        form_inputs = extract_form_inputs(soup)
+        form_inputs = extract_form_inputs(snapshot)
         input_fields.extend(form_inputs)
     except Exception as e:
         print(f"Error extracting input fields: {e}")
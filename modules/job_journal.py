@@ -0,0 +1,113 @@
+import os
+import time
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    state TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result_path TEXT,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stages (
+    url TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    result_path TEXT,
+    finished REAL NOT NULL,
+    PRIMARY KEY (url, stage)
+);
+"""
+
+class JobJournal:
+    """SQLite record of a scan's progress, so an interrupted run can be resumed.
+
+    Each URL is ``running`` while a worker has it, then ``done`` or
+    ``failed`` (page did not load, a stage raised or the job crashed). A URL
+    still ``running`` when the process died counts as failed. Stages that
+    finished are recorded per URL with the results file holding their
+    findings, so a retried URL only reruns the stages that did not.
+
+    Every update is its own small transaction in WAL mode, so the journal
+    costs a few unsynced writes per URL and survives the process crashing
+    at any point.
+    """
+
+    def __init__(self, path="results/journal.sqlite", max_attempts=3):
+        self.path = path
+        self.max_attempts = max_attempts
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def reset(self):
+        """Forget every URL, for a run that starts over instead of resuming."""
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM urls")
+            self._db.execute("DELETE FROM stages")
+
+    def should_run(self, url):
+        """Return (run, reason): False with 'done' or 'gave up' for URLs a resumed run skips."""
+        with self._lock:
+            row = self._db.execute("SELECT state, attempts FROM urls WHERE url = ?", (url,)).fetchone()
+        if row is None:
+            return True, None
+        state, attempts = row
+        if state == 'done':
+            return False, 'done'
+        if attempts >= self.max_attempts:
+            return False, 'gave up'
+        return True, None
+
+    def pending(self, urls, skipped=None):
+        """Lazily filter an iterable of URLs down to those still to run.
+
+        ``skipped`` is called with (url, reason) for every URL left out.
+        """
+        for url in urls:
+            run, reason = self.should_run(url)
+            if run:
+                yield url
+            elif skipped:
+                skipped(url, reason)
+
+    def start(self, url):
+        """Mark a URL as taken by a worker and count the attempt."""
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT INTO urls (url, state, attempts, updated) VALUES (?, 'running', 1, ?) "
+                "ON CONFLICT(url) DO UPDATE SET state = 'running', attempts = attempts + 1, updated = excluded.updated",
+                (url, time.time()))
+
+    def stage_done(self, url, stage, result_path=None):
+        """Record that a stage finished for a URL and where its findings were written."""
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO stages (url, stage, result_path, finished) VALUES (?, ?, ?, ?)",
+                             (url, stage, result_path, time.time()))
+
+    def completed_stages(self, url):
+        """Return the names of the stages already finished for a URL."""
+        with self._lock:
+            return {stage for stage, in self._db.execute("SELECT stage FROM stages WHERE url = ?", (url,))}
+
+    def finish(self, url, error=None, result_path=None):
+        """Mark a URL done, or failed if there is an error."""
+        with self._lock, self._db:
+            self._db.execute("UPDATE urls SET state = ?, error = ?, result_path = ?, updated = ? WHERE url = ?",
+                             ('failed' if error else 'done', error, result_path, time.time(), url))
+
+    def stats(self):
+        """Return the number of URLs in each state."""
+        with self._lock:
+            return dict(self._db.execute("SELECT state, COUNT(*) FROM urls GROUP BY state"))
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -1,103 +1,254 @@
-import re
+import os
 import asyncio
-import aiohttp
-import ast
+import hashlib
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
-from selenium.webdriver.common.by import By
-
-async def fetch_js_content(session, url):
-    """Fetch JavaScript file content asynchronously."""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36 MrColonel',
-        'X-Researcher-Username': 'mrcolonel'
-    }
+from modules.page_snapshot import PageSnapshot
+from modules.http_client import get_async_session, import_driver_cookies
+from modules.url_canonicalizer import canonicalize_url
+from modules.pattern_engine import get_engine
+from modules.js_lexer import JSLexer, JSFeatureExtractor
+
+# Bump when the analysis output changes so cached analyses are recomputed
+ANALYSIS_VERSION = "analysis-v3"
+
+# Downloads and analysis read scripts in chunks of this many bytes/characters
+CHUNK_SIZE = 64 * 1024
+# Bodies beyond this size are cut off; the part read so far is still analyzed
+MAX_JS_BYTES = 20 * 1024 * 1024
+# Longest match guaranteed to be found across a chunk boundary
+SCAN_OVERLAP = 4096
+# Distinct values kept per rule, and match locations kept, per script
+MAX_MATCHES = 2000
+
+async def fetch_js_content(session, url, cache=None, max_bytes=MAX_JS_BYTES):
+    """Stream a JavaScript file to disk, revalidating any cached copy.
+
+    Returns:
+        tuple: (path, content_hash, truncated). path is the file holding the
+        body, or None when the download failed; content_hash is only set when
+        the body is in the cache, otherwise path is a temporary file the
+        caller removes. truncated is True when the body was cut at max_bytes.
+    """
+    entry = cache.lookup(url) if cache else None
+    headers = cache.conditional_headers(entry) if entry else {}
     try:
         async with session.get(url, headers=headers, timeout=30) as response:
+            if response.status == 304 and entry:
+                cache.revalidated(entry)
+                return cache.path(entry['content_hash']), entry['content_hash'], False
             if response.status == 200:
-                return await response.text()
+                return await download_js(response, url, cache, max_bytes)
     except Exception as e:
         print(f"Error fetching {url}: {e}")
-    return None
+    return None, None, False
+
+async def download_js(response, url, cache=None, max_bytes=MAX_JS_BYTES):
+    """Copy a response body to disk chunk by chunk, stopping at max_bytes."""
+    # Downloading next to the blobs lets the cache adopt the file without copying it
+    fd, path = tempfile.mkstemp(dir=cache.blobs_dir if cache else None, suffix=".tmp")
+    digest = hashlib.sha256()
+    size = 0
+    truncated = False
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                if size + len(chunk) > max_bytes:
+                    chunk = chunk[:max_bytes - size]
+                    truncated = True
+                f.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+                if truncated:
+                    break
+    except Exception:
+        os.remove(path)
+        raise
+
+    if truncated:
+        # A partial body is analyzed but never cached as the URL's content
+        print(f"Stopped reading {url} after {max_bytes} bytes")
+        return path, None, True
+    if cache:
+        content_hash = digest.hexdigest()
+        cache.store_file(url, path, content_hash, size, response.headers)
+        return cache.path(content_hash), content_hash, False
+    return path, None, False
+
+PATTERN_RULES = ("api_key", "token", "secret", "password", "endpoint")
+CONTEXT_RULES = {"auth_token": "authentication", "config": "configuration"}
 
 def search_js_patterns(js_content):
     """Search for advanced patterns in JavaScript files."""
-    patterns = {
-        "api_key": r'API_KEY\s*=\s*["\'](.*?)["\']',
-        "token": r'token\s*=\s*["\'](.*?)["\']',
-        "secret": r'secret\s*=\s*["\'](.*?)["\']',
-        "password": r'password\s*=\s*["\'](.*?)["\']',
-        "endpoint": r'https?://[^\s\'"]+'
-    }
-    results = {}
-    for key, pattern in patterns.items():
-        matches = re.findall(pattern, js_content)
-        if matches:
-            results[key] = matches
-    return results
+    return get_engine(PATTERN_RULES).findall(js_content)
 
-def analyze_context(js_content):
-    """Analyze the context of extracted patterns."""
+def build_context(found):
+    """Sort context-rule matches into their categories."""
     context = {
         "authentication": [],
         "configuration": [],
         "sensitive_data": []
     }
-    # Example: Look for authentication tokens
-    auth_tokens = re.findall(r'authToken\s*=\s*["\'](.*?)["\']', js_content)
-    if auth_tokens:
-        context["authentication"].extend(auth_tokens)
-    # Example: Look for configuration variables
-    config_vars = re.findall(r'config\s*=\s*{.*?}', js_content, re.DOTALL)
-    if config_vars:
-        context["configuration"].extend(config_vars)
+    for rule, category in CONTEXT_RULES.items():
+        context[category].extend(found.get(rule, []))
     return context
 
-def parse_js_with_ast(js_content):
-    """Parse JavaScript content using AST."""
+def analyze_context(js_content):
+    """Analyze the context of extracted patterns."""
+    return build_context(get_engine(tuple(CONTEXT_RULES)).findall(js_content))
+
+def summarize_matches(matches, max_items=MAX_MATCHES):
+    """Group engine matches into (patterns, context, locations, total) without holding every match.
+
+    Each rule keeps its distinct values once, in first-seen order, up to
+    ``max_items``; locations are the {'rule', 'start', 'end'} offsets of
+    the first ``max_items`` hits (the values are in patterns/context), and
+    total counts every hit.
+    """
+    found = {}
+    locations = []
+    total = 0
+    for match in matches:
+        total += 1
+        values = found.setdefault(match.rule, {})
+        if len(values) < max_items:
+            values[match.value] = None
+        if len(locations) < max_items:
+            locations.append({'rule': match.rule, 'start': match.start, 'end': match.end})
+    found = {rule: list(values) for rule, values in found.items()}
+    patterns = {rule: found[rule] for rule in PATTERN_RULES if rule in found}
+    return patterns, build_context(found), locations, total
+
+# Features reported when the lexer fails on a script
+EMPTY_FEATURES = {'functions': [], 'identifiers': [], 'strings': [], 'object_keys': [], 'call_sites': []}
+
+def analyze_js_chunks(chunks):
+    """Run every analysis over a script body given as an iterable of text chunks.
+
+    The pattern scan and the lexer consume each chunk as it is read, so only
+    one chunk plus the scan overlap is held at a time, and every result list
+    is capped, so memory stays flat however large the script. If the lexer fails,
+    the pattern scan still finishes and the structural features are empty.
+    """
+    lexer = JSLexer()
+    extractor = JSFeatureExtractor()
+    lex_error = None
+
+    def lexed(chunks):
+        nonlocal lex_error
+        for chunk in chunks:
+            if lex_error is None:
+                try:
+                    for token in lexer.feed(chunk):
+                        extractor.add(token)
+                except Exception as e:
+                    lex_error = e
+            yield chunk
+
+    # Search for patterns and analyze context in one streaming scan
+    engine = get_engine(PATTERN_RULES + tuple(CONTEXT_RULES))
+    patterns, context, matches, match_count = summarize_matches(engine.scan_stream(lexed(chunks), overlap=SCAN_OVERLAP))
+    # Tokenize and extract structural features
+    if lex_error is None:
+        try:
+            for token in lexer.close():
+                extractor.add(token)
+        except Exception as e:
+            lex_error = e
+    if lex_error is not None:
+        print(f"Error lexing JavaScript: {lex_error}")
+    return dict({
+        'patterns': patterns,
+        'context': context,
+        'matches': matches,
+        'match_count': match_count
+    }, **(EMPTY_FEATURES if lex_error is not None else extractor.result()))
+
+def read_js_chunks(path, chunk_size=CHUNK_SIZE):
+    """Yield the text of a downloaded script in chunks."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+def analyze_js_file(path):
+    """Run every analysis over a script stored on disk without loading it whole."""
+    return analyze_js_chunks(read_js_chunks(path))
+
+def create_analysis_executor(workers=None):
+    """Create the executor that runs analyze_js_file off the event loop.
+
+    Args:
+        workers (int): Worker processes; None uses one per CPU and 0 analyzes
+            on the event loop's default thread pool instead.
+
+    Returns:
+        Executor or None: None selects the loop's default executor.
+    """
+    if workers == 0:
+        return None
+    # Spawned workers do not inherit the browser and event-loop threads of this process
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+async def analyze_js_url(session, js_url, cache=None, executor=None, max_bytes=MAX_JS_BYTES):
+    """Download one script and analyze it in the executor as soon as it arrives."""
     try:
-        # Parse JavaScript content into an AST
-        tree = ast.parse(js_content)
-        # Example: Extract function definitions
-        functions = [node.name for node in ast.walk(tree) if isinstance(node, ast.FunctionDef)]
-        return functions
+        path, content_hash, truncated = await fetch_js_content(session, js_url, cache, max_bytes)
+        # An unchanged bundle reuses the analysis stored next to it
+        analysis = cache.get_analysis(content_hash, ANALYSIS_VERSION) if content_hash else None
+        if analysis is None:
+            if not path:
+                return None
+            loop = asyncio.get_running_loop()
+            try:
+                analysis = await loop.run_in_executor(executor, analyze_js_file, path)
+            finally:
+                if not content_hash:
+                    os.remove(path)
+            if content_hash:
+                cache.put_analysis(content_hash, ANALYSIS_VERSION, analysis)
+        result = dict({'url': js_url}, **analysis)
+        if truncated:
+            result['truncated'] = True
+        return result
     except Exception as e:
-        print(f"Error parsing JS with AST: {e}")
-        return []
+        print(f"Error analyzing {js_url}: {e}")
+        return None
+
+async def search_js_files(driver, base_url, base_domain, snapshot=None, cache=None, executor=None, max_bytes=MAX_JS_BYTES):
+    """Search JavaScript files for parameters asynchronously.
 
-async def search_js_files(driver, base_url, base_domain):
-    """Search JavaScript files for parameters asynchronously."""
+    Each script is handed to ``executor`` as soon as its download finishes,
+    and results are returned in the order their analyses complete.
+    """
     js_parameters = []
     try:
         # Extract all script tags with src attributes
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        script_tags = soup.find_all('script', src=True)
-
-        async with aiohttp.ClientSession() as session:
-            tasks = []
-            for script in script_tags:
-                js_url = urljoin(base_url, script['src'])
-                if urlparse(js_url).netloc == base_domain:  # Filter by domain
-                    print(f"Analyzing JavaScript file: {js_url}")
-                    tasks.append(fetch_js_content(session, js_url))
-
-            js_contents = await asyncio.gather(*tasks)
-
-            for js_content in js_contents:
-                if js_content:
-                    # Search for patterns
-                    patterns = search_js_patterns(js_content)
-                    # Analyze context
-                    context = analyze_context(js_content)
-                    # Parse with AST
-                    functions = parse_js_with_ast(js_content)
-                    # Combine results
-                    js_parameters.append({
-                        'url': js_url,
-                        'patterns': patterns,
-                        'context': context,
-                        'functions': functions
-                    })
+        snapshot = snapshot or PageSnapshot.from_driver(driver)
+        script_tags = [script for script in snapshot.scripts if script.has_attr('src')]
+
+        # Deduplicate scripts referenced under different spellings of one URL
+        js_urls = {}
+        for script in script_tags:
+            js_url = urljoin(base_url, script['src'])
+            if urlparse(js_url).netloc == base_domain:  # Filter by domain
+                js_urls.setdefault(canonicalize_url(js_url), js_url)
+
+        # Pooled per-loop session: scripts on one host share keep-alive connections
+        session = import_driver_cookies(driver, get_async_session())
+        tasks = []
+        for js_url in js_urls.values():
+            print(f"Analyzing JavaScript file: {js_url}")
+            tasks.append(analyze_js_url(session, js_url, cache, executor, max_bytes))
+
+        for next_result in asyncio.as_completed(tasks):
+            result = await next_result
+            if result:
+                js_parameters.append(result)
     except Exception as e:
         print(f"Error searching JavaScript files: {e}")
-    return js_parameters
\ No newline at end of file
+    return js_parameters
@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from modules.metrics import metrics
+from modules.utils import write_atomic
+
+class JSCache:
+    """Persistent, content-addressed cache for fetched JavaScript and its analysis.
+
+    Layout under ``directory``:
+        entries/<sha256(url)>.json        validators and content hash for a URL
+        blobs/<sha256(content)>.js        the script body, shared by every URL serving it
+        blobs/<sha256(content)>.<tag>.json analysis output for that body
+
+    Blob modification times track last use; ``evict`` removes the least
+    recently used blobs, with their analyses and the entries pointing at
+    them, until the cache fits in ``max_bytes``. It lists the whole blob
+    directory, so it runs each time ``evict_bytes`` of new blobs have been
+    stored and once at the end of a run rather than after every page.
+    """
+
+    def __init__(self, directory=".cache/js", max_bytes=512 * 1024 * 1024, evict_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.evict_bytes = evict_bytes if evict_bytes is not None else max_bytes // 8
+        self.entries_dir = os.path.join(directory, "entries")
+        self.blobs_dir = os.path.join(directory, "blobs")
+        os.makedirs(self.entries_dir, exist_ok=True)
+        os.makedirs(self.blobs_dir, exist_ok=True)
+        self.hits = 0
+        self.misses = 0
+        self._stored_bytes = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, url):
+        """Return the cached entry for a URL, or None if it is unknown or its blob was evicted."""
+        entry_path = self._entry_path(url)
+        try:
+            with open(entry_path, "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(self._blob_path(entry['content_hash'])):
+            self._remove(entry_path)
+            return None
+        return entry
+
+    def conditional_headers(self, entry):
+        """Headers that let the server answer 304 if the cached copy is still current."""
+        headers = {}
+        if entry and entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry and entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store_file(self, url, path, content_hash, size, response_headers):
+        """Adopt a body already streamed to ``path`` (inside the blobs directory) under its hash."""
+        blob_path = self._blob_path(content_hash)
+        if os.path.exists(blob_path):
+            os.remove(path)
+            new_bytes = 0
+        else:
+            os.replace(path, blob_path)
+            new_bytes = size
+        entry = self._write_entry(url, content_hash, size, response_headers)
+        with self._lock:
+            self._stored_bytes += new_bytes
+            due = self._stored_bytes >= self.evict_bytes
+            if due:
+                self._stored_bytes = 0
+        if due:
+            self.evict()
+        return entry
+
+    def revalidated(self, entry):
+        """Record that the server confirmed a cached copy (HTTP 304)."""
+        self.hits += 1
+        metrics.cache('js', True)
+        self._touch(self._blob_path(entry['content_hash']))
+
+    def path(self, content_hash):
+        """Return the file holding a cached script body."""
+        return self._blob_path(content_hash)
+
+    def get_analysis(self, content_hash, tag):
+        """Return the stored analysis of a body under a version tag, or None."""
+        try:
+            with open(self._analysis_path(content_hash, tag), "r") as f:
+                analysis = json.load(f)
+        except (OSError, ValueError):
+            metrics.cache('js_analysis', False)
+            return None
+        metrics.cache('js_analysis', True)
+        return analysis
+
+    def put_analysis(self, content_hash, tag, analysis):
+        """Store the analysis of a body next to it."""
+        write_atomic(self._analysis_path(content_hash, tag), json.dumps(analysis).encode('utf-8'))
+
+    def evict(self):
+        """Delete least recently used blobs, and the entries that point at them, until the cache fits in max_bytes."""
+        blobs = {}
+        total = 0
+        for name in os.listdir(self.blobs_dir):
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(self.blobs_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            content_hash = name.split(".", 1)[0]
+            used, size, paths = blobs.get(content_hash, (0, 0, []))
+            blobs[content_hash] = (max(used, stat.st_mtime), size + stat.st_size, paths + [path])
+            total += stat.st_size
+
+        evicted = set()
+        for content_hash, (used, size, paths) in sorted(blobs.items(), key=lambda item: item[1][0]):
+            if total <= self.max_bytes:
+                break
+            for path in paths:
+                self._remove(path)
+            total -= size
+            evicted.add(content_hash)
+            logging.info(f"Evicted cached script {content_hash} ({size} bytes)")
+        if evicted:
+            self._remove_entries(evicted)
+
+    def _remove_entries(self, content_hashes):
+        # Entries are keyed by URL, so finding those of evicted blobs means reading them all
+        for name in os.listdir(self.entries_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.entries_dir, name)
+            try:
+                with open(path, "r") as f:
+                    content_hash = json.load(f)['content_hash']
+            except (OSError, ValueError, KeyError):
+                continue
+            if content_hash in content_hashes:
+                self._remove(path)
+
+    def stats(self):
+        """Return revalidation hit/miss counters."""
+        return {'hits': self.hits, 'misses': self.misses}
+
+    def _write_entry(self, url, content_hash, size, response_headers):
+        entry = {
+            'url': url,
+            'etag': response_headers.get('ETag'),
+            'last_modified': response_headers.get('Last-Modified'),
+            'content_hash': content_hash,
+            'size': size,
+            'fetched_at': time.time()
+        }
+        write_atomic(self._entry_path(url), json.dumps(entry).encode('utf-8'))
+        self.misses += 1
+        metrics.cache('js', False)
+        return entry
+
+    def _entry_path(self, url):
+        return os.path.join(self.entries_dir, hashlib.sha256(url.encode('utf-8')).hexdigest() + ".json")
+
+    def _blob_path(self, content_hash):
+        return os.path.join(self.blobs_dir, content_hash + ".js")
+
+    def _analysis_path(self, content_hash, tag):
+        return os.path.join(self.blobs_dir, f"{content_hash}.{tag}.json")
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _touch(self, path):
+        try:
+            os.utime(path)
+        except OSError:
+            pass
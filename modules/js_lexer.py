@@ -0,0 +1,262 @@
+import re
+from collections import namedtuple
+from urllib.parse import urlsplit, parse_qsl
+
+Token = namedtuple("Token", ["kind", "value", "start"])
+
+_COMMON = r"""
+    (?P<ws>\s+)
+  | (?P<comment>//[^\n]*|/\*[\s\S]*?\*/)
+  | (?P<string>"(?:[^"\\\n]|\\[\s\S])*"|'(?:[^'\\\n]|\\[\s\S])*')
+  | (?P<template>`(?:[^`\\]|\\[\s\S])*`)
+  | (?P<number>0[xXoObB][\da-fA-F_]+n?|(?:\d[\d_]*\.?[\d_]*|\.\d[\d_]*)(?:[eE][+-]?\d+)?n?)
+  | (?P<identifier>(?:[^\W\d]|\$)(?:\w|\$)*)
+"""
+
+_PUNCTUATORS = r"""
+  | (?P<punct>>>>=|\.\.\.|===|!==|\*\*=|<<=|>>=|>>>|\?\?=|&&=|\|\|=|=>|==|!=|<=|>=|&&|\|\||\?\?|\?\.
+              |\+\+|--|\+=|-=|\*=|%=|&=|\|=|\^=|\*\*|<<|>>|[{}()\[\];,<>+\-*%&|^!~?:=.@\#])
+"""
+
+# One table covers every token; a '/' it reads as division is re-read as a
+# regex literal when it appears where an expression may start.
+TOKENS = re.compile(_COMMON + _PUNCTUATORS + r"""
+  | (?P<div>/=?)
+  | (?P<other>[\s\S])
+""", re.X)
+
+REGEX_LITERAL = re.compile(r"/(?![*/])(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*")
+
+# Keywords after which '/' starts a regex literal rather than a division
+REGEX_PRECEDING_KEYWORDS = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await'
+}
+
+# Tokens that may be cut short at a chunk boundary and must wait for more input
+_OPEN_ENDED = {'ws', 'comment', 'number', 'identifier', 'punct', 'div', 'regex'}
+_QUOTES = set('"\'`')
+
+class JSLexer:
+    """Incremental JavaScript tokenizer over a compiled regex token table.
+
+    ``feed`` accepts text in arbitrary chunks and yields every token that is
+    certainly complete; a token touching the end of the buffered text is held
+    back until more input (or ``close``) arrives. At most ``max_pending``
+    characters are held, so memory stays bounded even for unterminated
+    strings or comments. Whitespace and comments are not emitted.
+    """
+
+    def __init__(self, max_pending=1 << 20):
+        self.max_pending = max_pending
+        self._buffer = ""
+        self._offset = 0
+        self._regex_allowed = True
+
+    def feed(self, chunk):
+        """Add text and yield the tokens it completes."""
+        self._buffer += chunk
+        return self._tokens(final=False)
+
+    def close(self):
+        """Yield the tokens still held back at the end of input."""
+        return self._tokens(final=True)
+
+    def _tokens(self, final):
+        buffer = self._buffer
+        length = len(buffer)
+        position = 0
+        regex_allowed = self._regex_allowed
+        holding = False
+        while position < length and not holding:
+            # finditer walks the buffer in C; the loop only restarts after a regex literal
+            restarted = False
+            for match in TOKENS.finditer(buffer, position):
+                kind = match.lastgroup
+                start = match.start()
+                end = match.end()
+                may_continue = not final and length - start < self.max_pending
+                if kind == 'div' and regex_allowed:
+                    literal = REGEX_LITERAL.match(buffer, start)
+                    if literal is None and may_continue:
+                        # The closing slash may still be in the next chunk
+                        holding = True
+                        break
+                    if literal is not None:
+                        if may_continue and literal.end() == length:
+                            holding = True
+                            break
+                        yield Token('regex', literal.group(), self._offset + start)
+                        regex_allowed = False
+                        position = literal.end()
+                        restarted = True
+                        break
+                if may_continue:
+                    # The token might continue in the next chunk, a quote only fell
+                    # through to 'other' because its closing half is missing, or a
+                    # '/*' only fell through to 'div' because its '*/' is missing
+                    if ((end == length and kind in _OPEN_ENDED) or (kind == 'other' and buffer[start] in _QUOTES)
+                            or (kind == 'div' and buffer.startswith('/*', start))):
+                        holding = True
+                        break
+                if kind != 'ws' and kind != 'comment':
+                    value = match.group()
+                    yield Token(kind, value, self._offset + start)
+                    if kind == 'identifier':
+                        regex_allowed = value in REGEX_PRECEDING_KEYWORDS
+                    elif kind == 'punct':
+                        regex_allowed = value not in (')', ']', '}')
+                    else:
+                        regex_allowed = False
+                position = end
+            if holding:
+                position = start
+            elif not restarted:
+                break
+        self._regex_allowed = regex_allowed
+        self._buffer = buffer[position:]
+        self._offset += position
+
+def tokenize(text):
+    """Tokenize a complete JavaScript source."""
+    lexer = JSLexer()
+    yield from lexer.feed(text)
+    yield from lexer.close()
+
+HTTP_CLIENTS = {'fetch', 'axios', '$', 'jQuery'}
+HTTP_METHODS = {'get', 'post', 'put', 'patch', 'delete', 'head', 'options', 'request', 'ajax', 'getJSON'}
+
+# Request options whose names say nothing about the parameters an endpoint accepts
+REQUEST_OPTION_KEYS = {
+    'method', 'headers', 'body', 'credentials', 'mode', 'cache', 'redirect',
+    'referrer', 'referrerPolicy', 'integrity', 'keepalive', 'signal', 'params',
+    'data', 'url', 'timeout', 'withCredentials', 'responseType', 'baseURL',
+    'type', 'dataType', 'contentType', 'success', 'error', 'complete', 'async'
+}
+
+def _literal_value(token):
+    if token.kind in ('string', 'template'):
+        return token.value[1:-1]
+    return token.value
+
+class JSFeatureExtractor:
+    """Collect identifiers, strings, object keys, function names and HTTP call sites from tokens.
+
+    Works on a token stream in one pass with a few tokens of look-behind, so
+    it can follow a JSLexer over a file of any size. Each collection keeps at
+    most ``max_items`` distinct entries; string values are truncated to
+    ``max_string_length`` characters.
+    """
+
+    def __init__(self, max_items=2000, max_string_length=512):
+        self.max_items = max_items
+        self.max_string_length = max_string_length
+        self.identifiers = {}
+        self.strings = {}
+        self.object_keys = {}
+        self.functions = {}
+        self.call_sites = []
+        self._uses_xhr = False
+        self._previous = [None, None, None]
+        self._depth = 0
+        self._open_calls = []
+
+    def add(self, token):
+        """Consume one token."""
+        kind, value = token.kind, token.value
+        before, previous = self._previous[1], self._previous[2]
+
+        if kind == 'identifier':
+            self._remember(self.identifiers, value)
+            if value == 'XMLHttpRequest':
+                self._uses_xhr = True
+            if previous is not None and previous.value == 'function':
+                self._remember(self.functions, value)
+            elif value == 'function' and previous is not None and previous.value in ('=', ':') and before is not None and before.kind == 'identifier':
+                self._remember(self.functions, before.value)
+        elif kind in ('string', 'template'):
+            self._remember(self.strings, _literal_value(token)[:self.max_string_length])
+
+        if kind == 'punct':
+            if value == ':' and previous is not None and previous.kind in ('identifier', 'string', 'number') \
+                    and before is not None and before.value in ('{', ','):
+                key = _literal_value(previous)
+                self._remember(self.object_keys, key)
+                if key not in REQUEST_OPTION_KEYS:
+                    for call in self._open_calls:
+                        call['parameters'].add(key)
+            elif value == '(':
+                self._depth += 1
+                api = self._call_api(previous, before)
+                if api:
+                    self._open_calls.append({'api': api, 'offset': token.start, 'url': None, 'parameters': set(), 'depth': self._depth})
+            elif value == ')':
+                while self._open_calls and self._open_calls[-1]['depth'] == self._depth:
+                    self._finish_call(self._open_calls.pop())
+                self._depth = max(0, self._depth - 1)
+        elif kind in ('string', 'template') and self._open_calls:
+            call = self._open_calls[-1]
+            literal = _literal_value(token)
+            if call['url'] is None and previous is not None and previous.value in ('(', ',') and ('/' in literal or '?' in literal):
+                call['url'] = literal[:self.max_string_length]
+                if '?' in literal:
+                    call['parameters'].update(name for name, _ in parse_qsl(urlsplit(literal).query, keep_blank_values=True))
+
+        self._previous = [self._previous[1], self._previous[2], token]
+
+    def _call_api(self, previous, before):
+        if previous is None or previous.kind != 'identifier':
+            return None
+        name = previous.value
+        if name == 'fetch':
+            return name
+        if before is None or before.value != '.':
+            return name if name == 'axios' else None
+        owner = self._previous[0]
+        if owner is not None and owner.kind == 'identifier':
+            if owner.value in HTTP_CLIENTS and name in HTTP_METHODS:
+                return f"{owner.value}.{name}"
+        if self._uses_xhr and name in ('open', 'send'):
+            return f"XMLHttpRequest.{name}"
+        return None
+
+    def _finish_call(self, call):
+        if len(self.call_sites) < self.max_items:
+            self.call_sites.append({
+                'api': call['api'],
+                'offset': call['offset'],
+                'url': call['url'],
+                'parameters': sorted(call['parameters'])
+            })
+
+    def _remember(self, collection, value):
+        if value in collection:
+            collection[value] += 1
+        elif len(collection) < self.max_items:
+            collection[value] = 1
+
+    def result(self):
+        """Return the collected features as plain lists."""
+        for call in self._open_calls:
+            self._finish_call(call)
+        self._open_calls = []
+        return {
+            'functions': list(self.functions),
+            'identifiers': list(self.identifiers),
+            'strings': list(self.strings),
+            'object_keys': list(self.object_keys),
+            'call_sites': self.call_sites
+        }
+
+def extract_js_features(chunks, max_items=2000):
+    """Lex JavaScript given as a string or an iterable of text chunks and extract its features."""
+    if isinstance(chunks, str):
+        chunks = (chunks,)
+    lexer = JSLexer()
+    extractor = JSFeatureExtractor(max_items=max_items)
+    for chunk in chunks:
+        for token in lexer.feed(chunk):
+            extractor.add(token)
+    for token in lexer.close():
+        extractor.add(token)
+    return extractor.result()
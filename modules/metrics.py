@@ -0,0 +1,210 @@
+import os
+import json
+import time
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+NAMESPACE = "parameterminer"
+
+# Help text for the Prometheus export; metrics not listed get a generic one
+DESCRIPTIONS = {
+    'analyze_url_seconds': "Wall-clock time to analyze one URL.",
+    'analyze_url_cpu_seconds': "CPU time of the scanning thread per URL.",
+    'page_load_seconds': "Wall-clock time of the initial driver.get per URL, by backend.",
+    'page_load_cpu_seconds': "CPU time of the scanning thread during the initial driver.get, by backend.",
+    'stage_seconds': "Wall-clock time per stage run.",
+    'stage_cpu_seconds': "CPU time of the scanning thread per stage run (process-pool work excluded).",
+    'stage_errors': "Stage runs that raised, by stage.",
+    'webdriver_command_seconds': "WebDriver round trips, by command.",
+    'http_requests': "HTTP requests sent outside the browser, by client, host and status.",
+    'http_response_bytes': "HTTP response body bytes received outside the browser, by host.",
+    'cache_lookups': "Cache lookups, by cache and result.",
+    'urls': "URLs analyzed, by result.",
+    'urls_skipped': "URLs a resumed run skipped, by reason.",
+    'scheduler_in_flight': "URLs being analyzed.",
+    'scheduler_deferred': "URLs waiting because their host is at its concurrency cap.",
+    'driver_pool_idle': "Warm drivers waiting in a driver pool, by pool.",
+    'driver_pool_live': "Drivers alive in a driver pool, by pool.",
+    'js_render_escalations': "URLs loaded over HTTP that needed a browser to render.",
+    'traffic_queue': "Captured requests waiting in a TrafficMonitor queue.",
+}
+
+def _key(name, labels):
+    return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, value in pairs)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + "}"
+
+def _format_value(value):
+    # Exact integers for counts and bytes; %g would round large ones
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+class Metrics:
+    """Thread-safe counters, gauges and timings for one run, exportable as JSON or Prometheus text.
+
+    - count(): monotonically increasing counters (Prometheus counters, ``_total``)
+    - gauge(): current value of a level such as a queue depth, plus the highest seen
+    - observe()/timer(): durations, kept as count, sum and max (Prometheus summaries)
+
+    Every metric takes keyword labels, e.g. ``count('http_requests', host=...)``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget everything recorded and restart the run clock."""
+        with self._lock:
+            self.started = time.time()
+            self._counters = defaultdict(float)
+            self._gauges = {}
+            self._timings = {}
+
+    def count(self, name, value=1, **labels):
+        """Add to a counter."""
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] += value
+
+    def gauge(self, name, value, **labels):
+        """Set a gauge, remembering its highest value."""
+        key = _key(name, labels)
+        with self._lock:
+            current = self._gauges.get(key)
+            self._gauges[key] = [value, max(value, current[1]) if current else value]
+
+    def observe(self, name, value, **labels):
+        """Record one duration (or other measurement) of a summary."""
+        key = _key(name, labels)
+        with self._lock:
+            timing = self._timings.get(key)
+            if timing is None:
+                self._timings[key] = [1, value, value]
+            else:
+                timing[0] += 1
+                timing[1] += value
+                timing[2] = max(timing[2], value)
+
+    def cache(self, name, hit):
+        """Count a lookup in a named cache as a hit or a miss."""
+        self.count('cache_lookups', cache=name, result='hit' if hit else 'miss')
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe ``<name>_seconds`` (wall clock) and ``<name>_cpu_seconds`` (this thread's CPU) for a block.
+
+        CPU time is the calling thread's, so inside a coroutine it includes
+        whatever else ran on the same event loop meanwhile; each scan worker
+        runs one URL at a time on its own loop, so for stages it is the stage's.
+        """
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield
+        finally:
+            self.observe(f"{name}_seconds", time.perf_counter() - wall, **labels)
+            self.observe(f"{name}_cpu_seconds", time.thread_time() - cpu, **labels)
+
+    def summary(self):
+        """Return everything recorded as a JSON-serialisable dict, with cache hit rates."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = {key: list(value) for key, value in self._gauges.items()}
+            timings = {key: list(value) for key, value in self._timings.items()}
+        finished = time.time()
+
+        lookups = defaultdict(lambda: {'hit': 0, 'miss': 0})
+        for (name, labels), value in counters.items():
+            if name == 'cache_lookups':
+                labels = dict(labels)
+                lookups[labels.get('cache')][labels.get('result')] += value
+        return {
+            'started': self.started,
+            'finished': finished,
+            'seconds': round(finished - self.started, 3),
+            'counters': [{'name': name, 'labels': dict(labels), 'value': value}
+                         for (name, labels), value in sorted(counters.items())],
+            'gauges': [{'name': name, 'labels': dict(labels), 'value': value, 'max': highest}
+                       for (name, labels), (value, highest) in sorted(gauges.items())],
+            'timings': [{'name': name, 'labels': dict(labels), 'count': count, 'sum': round(total, 6),
+                         'mean': round(total / count, 6), 'max': round(highest, 6)}
+                        for (name, labels), (count, total, highest) in sorted(timings.items())],
+            'cache_hit_rates': {cache: round(result['hit'] / (result['hit'] + result['miss']), 4)
+                                for cache, result in sorted(lookups.items()) if result['hit'] + result['miss']},
+        }
+
+    def prometheus(self):
+        """Return everything recorded in the Prometheus text exposition format."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            gauges = sorted((key, list(value)) for key, value in self._gauges.items())
+            timings = sorted((key, list(value)) for key, value in self._timings.items())
+
+        lines = []
+        described = set()
+
+        def header(metric, name, kind):
+            if metric in described:
+                return
+            described.add(metric)
+            lines.append(f"# HELP {metric} {DESCRIPTIONS.get(name, name.replace('_', ' ').capitalize() + '.')}")
+            lines.append(f"# TYPE {metric} {kind}")
+
+        for (name, labels), value in counters:
+            metric = f"{NAMESPACE}_{name}_total"
+            header(metric, name, "counter")
+            lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), (value, highest) in gauges:
+            metric = f"{NAMESPACE}_{name}"
+            header(metric, name, "gauge")
+            lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), (value, highest) in gauges:
+            metric = f"{NAMESPACE}_{name}_max"
+            header(metric, name, "gauge")
+            lines.append(f"{metric}{_format_labels(labels)} {_format_value(highest)}")
+        for (name, labels), (count, total, highest) in timings:
+            metric = f"{NAMESPACE}_{name}"
+            header(metric, name, "summary")
+            lines.append(f"{metric}_count{_format_labels(labels)} {count}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {total:.6f}")
+            lines.append(f"{metric}{_format_labels(labels, [('quantile', '1')])} {highest:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, directory="results"):
+        """Write the run's JSON summary and Prometheus text file; return their paths."""
+        os.makedirs(directory, exist_ok=True)
+        stem = os.path.join(directory, f"metrics-{time.strftime('%Y%m%dT%H%M%S', time.localtime(self.started))}")
+        with open(stem + ".json", "w") as f:
+            json.dump(self.summary(), f, indent=4)
+        with open(stem + ".prom", "w") as f:
+            f.write(self.prometheus())
+        return stem + ".json", stem + ".prom"
+
+# The process-wide registry every module records into
+metrics = Metrics()
+
+def instrument_driver(driver):
+    """Time every WebDriver round trip of a driver, by command.
+
+    All Selenium commands go through ``WebDriver.execute``, so wrapping it
+    on the instance counts find_element, execute_script, get, ... alike.
+    """
+    execute = getattr(driver, 'execute', None)
+    if execute is None or getattr(execute, 'instrumented', False):
+        return driver
+
+    def timed_execute(driver_command, params=None):
+        start = time.perf_counter()
+        try:
+            return execute(driver_command, params)
+        finally:
+            metrics.observe('webdriver_command_seconds', time.perf_counter() - start, command=driver_command)
+
+    timed_execute.instrumented = True
+    driver.execute = timed_execute
+    return driver
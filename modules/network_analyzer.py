@@ -1,30 +1,36 @@
 import json
-import re
+import zlib
+import hashlib
+import asyncio
+import logging
+import itertools
+import collections
 import time
 import threading
 import subprocess
-import requests
 from urllib.parse import urlparse
-from sklearn.ensemble import IsolationForest
-import pandas as pd
+from modules.url_canonicalizer import canonicalize_url
+from modules.pattern_engine import get_engine
+from modules.http_client import get_session
+from modules.metrics import metrics
+
+PAYLOAD_RULES = ("api_key", "jwt_token", "credit_card", "email")
 
 def analyze_payload(payload):
     """Analyze payload for sensitive data or patterns."""
     sensitive_data = []
-    patterns = {
-        "api_key": r'API_KEY\s*=\s*["\'](.*?)["\']',
-        "jwt_token": r'eyJ[A-Za-z0-9-_=]+\.[A-Za-z0-9-_=]+\.?[A-Za-z0-9-_.+/=]*',  # JWT token pattern
-        "credit_card": r'\b(?:\d[ -]*?){13,16}\b',  # Credit card number pattern
-        "email": r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'  # Email pattern
-    }
-    for key, pattern in patterns.items():
-        matches = re.findall(pattern, str(payload))
-        if matches:
-            sensitive_data.append({key: matches})
+    found = get_engine(PAYLOAD_RULES).findall(str(payload))
+    for key in PAYLOAD_RULES:
+        if key in found:
+            sensitive_data.append({key: found[key]})
     return sensitive_data
 
 def detect_anomalies(network_requests):
     """Detect anomalies in network requests using machine learning."""
+    # Deferred: pandas and scikit-learn cost seconds to import and most scans never get here
+    import pandas as pd
+    from sklearn.ensemble import IsolationForest
+
     # Example training data
     data = {
         'url_length': [len(request['url']) for request in network_requests],
@@ -46,7 +52,7 @@ def analyze_behavior(network_requests):
     """Analyze the behavior of network requests."""
     behavior = {
         'request_rate': len(network_requests),  # Total number of requests
-        'unique_endpoints': len(set(request['url'] for request in network_requests)),  # Unique endpoints
+        'unique_endpoints': len(set(request.get('endpoint', request['url']) for request in network_requests)),  # Unique endpoints
         'suspicious_sequences': []  # Suspicious sequences of requests
     }
 
@@ -69,60 +75,303 @@ def query_threat_intelligence(url):
     """Query threat intelligence databases for known malicious URLs."""
     # Example: Use VirusTotal API
     api_key = "your_virustotal_api_key"
-    response = requests.get(f"https://www.virustotal.com/api/v3/urls/{url}", headers={"x-apikey": api_key})
+    response = get_session().get(f"https://www.virustotal.com/api/v3/urls/{url}", headers={"x-apikey": api_key})
     return response.json()
 
 def monitor_network_requests(driver, base_domain, callback):
-    """Monitor network requests in real-time."""
-    def monitor():
+    """Call back once for every in-scope request as its response arrives.
+
+    Returns the TrafficMonitor; call its stop() to end monitoring.
+    """
+    monitor = TrafficMonitor(driver, base_domain).start()
+
+    def deliver():
+        for request in monitor:
+            try:
+                callback(request)
+            except Exception as e:
+                print(f"Error handling request {request.url}: {e}")
+
+    threading.Thread(target=deliver, daemon=True).start()
+    return monitor
+
+class TrafficMonitor:
+    """Push-based feed of a driver's traffic, built on selenium-wire's response interceptor.
+
+    selenium-wire calls the interceptor once per response on its proxy
+    thread, so every in-scope request is delivered exactly once, with its
+    response attached, without rescanning ``driver.requests``. Requests wait
+    in a queue of at most ``maxsize``; when it is full the proxy thread (and
+    so the browser) waits up to ``put_timeout`` seconds for the consumer
+    before the request is dropped and counted in ``dropped``.
+
+    Consume with ``for request in monitor`` from a thread or
+    ``async for request in monitor`` from an event loop. Iteration ends once
+    the monitor is stopped and the queue is drained. Requests that never get
+    a response are not seen.
+    """
+
+    def __init__(self, driver, base_domain=None, maxsize=1000, put_timeout=10.0):
+        self.driver = driver
+        self.base_domain = base_domain
+        self.maxsize = maxsize
+        self.put_timeout = put_timeout
+        self.delivered = 0
+        self.dropped = 0
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+        self._waiters = set()
+        self._stopped = False
+        self._previous = None
+
+    def start(self):
+        """Install the interceptor, chaining to one that was already set."""
+        self._previous = getattr(self.driver, 'response_interceptor', None)
+        self.driver.response_interceptor = self._intercept
+        return self
+
+    def stop(self):
+        """Remove the interceptor; iteration ends once the queued requests are consumed."""
+        if getattr(self.driver, 'response_interceptor', None) == self._intercept:
+            if self._previous is not None:
+                self.driver.response_interceptor = self._previous
+            else:
+                del self.driver.response_interceptor
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        self._wake_waiters()
+
+    def get(self, timeout=None):
+        """Return the next request, or None on timeout or once stopped and drained."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items or self._stopped, timeout) or not self._items:
+                return None
+            return self._pop()
+
+    def stats(self):
+        """Return counts of delivered and dropped requests and the current queue depth."""
+        with self._cond:
+            return {'delivered': self.delivered, 'dropped': self.dropped, 'queued': len(self._items)}
+
+    def __iter__(self):
         while True:
-            for request in driver.requests:
-                if request.method and urlparse(request.url).netloc == base_domain:
-                    callback(request)
-            time.sleep(1)  # Adjust sleep interval as needed
+            request = self.get()
+            if request is None:
+                return
+            yield request
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        waiter = (asyncio.get_running_loop(), asyncio.Event())
+        with self._cond:
+            self._waiters.add(waiter)
+        try:
+            while True:
+                with self._cond:
+                    if self._items:
+                        return self._pop()
+                    if self._stopped:
+                        raise StopAsyncIteration
+                    # Cleared under the lock, so a request queued after this still wakes us
+                    waiter[1].clear()
+                await waiter[1].wait()
+        finally:
+            with self._cond:
+                self._waiters.discard(waiter)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _intercept(self, request, response):
+        if self._previous is not None:
+            self._previous(request, response)
+        if not request.method or (self.base_domain and urlparse(request.url).netloc != self.base_domain):
+            return
+        with self._cond:
+            deadline = time.monotonic() + self.put_timeout
+            while len(self._items) >= self.maxsize and not self._stopped:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.dropped += 1
+                    logging.warning(f"Traffic queue full; dropped {request.url}")
+                    return
+                self._cond.wait(remaining)
+            if self._stopped:
+                return
+            if getattr(request, 'response', None) is None:
+                request.response = response
+            self._items.append(request)
+            metrics.gauge('traffic_queue', len(self._items))
+            self._cond.notify_all()
+        self._wake_waiters()
+
+    def _pop(self):
+        # Caller holds self._cond
+        request = self._items.popleft()
+        self.delivered += 1
+        self._cond.notify_all()
+        return request
+
+    def _wake_waiters(self):
+        with self._cond:
+            waiters = list(self._waiters)
+        for loop, event in waiters:
+            try:
+                loop.call_soon_threadsafe(event.set)
+            except RuntimeError:
+                # The consumer's loop is closed
+                pass
+
+class RequestStream:
+    """Cursor over the traffic selenium-wire has captured for one driver.
+
+    Each poll yields only requests captured since the previous poll, so every
+    request is processed exactly once however often the stream is read.
+    """
+
+    def __init__(self, driver, base_domain=None):
+        self.driver = driver
+        self.base_domain = base_domain
+        self.cursor = 0
+
+    def poll(self, final=True):
+        """Yield new in-scope requests in capture order.
+
+        With ``final=False`` the stream stops at the first request that is
+        still waiting for its response, and resumes there on the next poll.
+        """
+        # iter_requests loads captured requests lazily instead of copying the whole list
+        iter_requests = getattr(self.driver, 'iter_requests', None)
+        captured = iter_requests() if iter_requests else iter(self.driver.requests)
+        for request in itertools.islice(captured, self.cursor, None):
+            if request.response is None and not final:
+                break
+            self.cursor += 1
+            if not request.method:
+                continue
+            if self.base_domain is None or urlparse(request.url).netloc == self.base_domain:
+                yield request
+
+# Kinds of body, by Content-Type. JSON bodies are parsed, text bodies decoded,
+# media and binary bodies are never decoded.
+JSON_TYPES = ("application/json", "text/json")
+TEXT_TYPES = ("text/", "application/javascript", "application/x-javascript", "application/ecmascript",
+              "application/xml", "application/x-www-form-urlencoded", "application/graphql")
+MEDIA_TYPES = ("image/", "audio/", "video/", "font/", "application/font", "application/x-font",
+               "application/vnd.ms-fontobject", "application/vnd.apple.mpegurl")
+
+# Largest body of each kind kept inline in the results, in bytes
+INLINE_LIMITS = {'json': 256 * 1024, 'text': 64 * 1024, 'media': 0, 'binary': 0}
+# Largest body of each kind written to the blob store; bigger ones are recorded by hash and size only
+BLOB_LIMITS = {'json': 20 * 1024 * 1024, 'text': 20 * 1024 * 1024, 'media': 2 * 1024 * 1024, 'binary': 5 * 1024 * 1024}
+
+def body_kind(content_type, body):
+    """Classify a body as 'json', 'text', 'media' or 'binary' from its Content-Type."""
+    mime = (content_type or "").split(";", 1)[0].strip().lower()
+    if mime.startswith(JSON_TYPES) or mime.endswith("+json"):
+        return 'json'
+    if mime.startswith(TEXT_TYPES) or mime.endswith("+xml"):
+        return 'text'
+    if mime.startswith(MEDIA_TYPES):
+        return 'media'
+    if not mime:
+        # No declared type: a NUL byte near the start means binary
+        return 'binary' if b"\x00" in body[:1024] else 'text'
+    return 'binary'
+
+def decode_content(body, content_encoding):
+    """Undo a gzip or deflate Content-Encoding; other encodings raise ValueError."""
+    encoding = (content_encoding or "identity").strip().lower()
+    if encoding in ("identity", ""):
+        return body
+    if encoding in ("gzip", "x-gzip"):
+        return zlib.decompress(body, 16 + zlib.MAX_WBITS)
+    if encoding == "deflate":
+        try:
+            return zlib.decompress(body)
+        except zlib.error:
+            # Some servers send raw deflate without the zlib header
+            return zlib.decompress(body, -zlib.MAX_WBITS)
+    raise ValueError(f"Unsupported Content-Encoding: {encoding}")
+
+def capture_body(body, headers, blobs=None):
+    """Return how a captured body appears in the results.
+
+    Small JSON bodies are parsed, small text bodies decoded. Anything else
+    -- media, binary, or over INLINE_LIMITS for its kind -- becomes a
+    reference {'blob', 'size', 'content_type', 'stored'}: the body's sha256,
+    and whether it was written to the blob store (only if one is given and
+    the body is within BLOB_LIMITS).
+    """
+    if not body:
+        return None
+    content_type = headers.get('Content-Type')
+    kind = body_kind(content_type, body)
+    if kind in ('json', 'text'):
+        try:
+            body = decode_content(body, headers.get('Content-Encoding'))
+        except (ValueError, zlib.error):
+            kind = 'binary'
+
+    if len(body) <= INLINE_LIMITS[kind]:
+        text = body.decode('utf-8', errors='replace')
+        # fetch() sends a string body as text/plain, so JSON-looking plain text is tried too
+        if kind == 'json' or (kind == 'text' and text.lstrip()[:1] in ('{', '[')):
+            try:
+                return json.loads(text)
+            except ValueError:
+                pass
+        return text
+
+    content_hash = hashlib.sha256(body).hexdigest()
+    stored = blobs is not None and len(body) <= BLOB_LIMITS[kind]
+    if stored:
+        blobs.put(body, content_hash)
+    return {'blob': content_hash, 'size': len(body), 'content_type': content_type, 'stored': stored}
+
+def process_request(request, blobs=None):
+    """Convert one captured request into the network_requests result format.
+
+    Bodies are captured with capture_body; oversized and binary ones go to
+    the ``blobs`` BlobStore when given.
+    """
+    request_data = {
+        'url': request.url,
+        'endpoint': canonicalize_url(request.url),
+        'method': request.method,
+        'headers': dict(request.headers),
+        'body': capture_body(request.body, request.headers, blobs),
+        'response': {
+            'headers': dict(request.response.headers) if request.response else None,
+            'body': capture_body(request.response.body, request.response.headers, blobs) if request.response else None
+        }
+    }
+
+    # Analyze payload for sensitive data
+    request_data['sensitive_data'] = analyze_payload(request_data['body'])
+    return request_data
 
-    threading.Thread(target=monitor, daemon=True).start()
+def stream_network_requests(driver, base_domain, stream=None, final=True, blobs=None):
+    """Yield analyzed in-scope requests one at a time as they are read from the capture."""
+    stream = stream or RequestStream(driver, base_domain)
+    for request in stream.poll(final=final):
+        try:
+            yield process_request(request, blobs)
+        except Exception as e:
+            print(f"Error analyzing request {request.url}: {e}")
 
-def analyze_network_requests(driver, base_domain, rate_limit=1):
+def analyze_network_requests(driver, base_domain, stream=None, blobs=None):
     """Analyze network requests to identify API endpoints and important parameters."""
     network_requests = []
     try:
-        for request in driver.requests:
-            if request.method:  # Capture all HTTP methods
-                request_url = request.url
-                if urlparse(request_url).netloc == base_domain:  # Filter by domain
-                    request_data = {
-                        'url': request_url,
-                        'method': request.method,
-                        'headers': dict(request.headers),
-                        'body': None,
-                        'response': {
-                            'headers': dict(request.response.headers) if request.response else None,
-                            'body': None
-                        }
-                    }
-
-                    if request.body:
-                        try:
-                            # Parse JSON body if present
-                            request_data['body'] = json.loads(request.body.decode('utf-8'))
-                        except:
-                            # Handle non-JSON body
-                            request_data['body'] = request.body.decode('utf-8')
-
-                    if request.response:
-                        try:
-                            # Parse JSON response if present
-                            request_data['response']['body'] = json.loads(request.response.body.decode('utf-8'))
-                        except:
-                            # Handle non-JSON response
-                            request_data['response']['body'] = request.response.body.decode('utf-8')
-
-                    # Analyze payload for sensitive data
-                    request_data['sensitive_data'] = analyze_payload(request_data['body'])
-
-                    network_requests.append(request_data)
-                    time.sleep(rate_limit)  # Respect rate limit
+        for request_data in stream_network_requests(driver, base_domain, stream, blobs=blobs):
+            network_requests.append(request_data)
     except Exception as e:
         print(f"Error analyzing network requests: {e}")
-    return network_requests
\ No newline at end of file
+    return network_requests
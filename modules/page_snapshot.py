@@ -0,0 +1,98 @@
+from collections import defaultdict
+from bs4 import BeautifulSoup, FeatureNotFound
+from modules.dom_batch import collect_dom, dom_from_snapshot
+from modules.drivers import supports_javascript
+
+LINK_ATTRIBUTES = {'a': 'href', 'form': 'action', 'iframe': 'src', 'link': 'href'}
+
+INDEXED_TAGS = (
+    'form', 'input', 'textarea', 'select', 'button', 'datalist',
+    'script', 'style', 'meta', 'a', 'link', 'iframe'
+)
+
+def parse_html(source):
+    """Parse HTML with lxml, falling back to the pure-Python parser if lxml is missing."""
+    try:
+        return BeautifulSoup(source, 'lxml')
+    except FeatureNotFound:
+        return BeautifulSoup(source, 'html.parser')
+
+class PageSnapshot:
+    """A single parse of one page load, shared by every extractor.
+
+    Holds the raw source, the parsed tree and per-tag indexes built in one
+    walk over the document, so modules never re-fetch ``page_source`` or
+    re-parse it. ``dom`` carries the live-DOM values collected by
+    ``collect_dom`` when the snapshot was taken from a driver.
+    """
+
+    def __init__(self, source, url, driver=None, dom=None):
+        self.source = source or ""
+        self.url = url
+        self.driver = driver
+        self._dom = dom
+        self.soup = parse_html(self.source)
+        self._tags = defaultdict(list)
+        self.editable = []
+        for tag in self.soup.find_all(True):
+            if tag.name in INDEXED_TAGS:
+                self._tags[tag.name].append(tag)
+            if tag.has_attr('contenteditable'):
+                self.editable.append(tag)
+
+    @classmethod
+    def from_driver(cls, driver):
+        """Snapshot the page currently loaded in a driver, in one WebDriver round trip."""
+        if not supports_javascript(driver):
+            # Without a script engine the page source is all there is
+            return cls(driver.page_source, driver.current_url, driver)
+        try:
+            dom = collect_dom(driver)
+        except Exception:
+            # Non-HTML documents have no documentElement to serialise
+            return cls(driver.page_source, driver.current_url, driver)
+        return cls(dom['source'], dom['url'], driver, dom)
+
+    @property
+    def dom(self):
+        """Inputs, scripts, forms and web storage as seen by the browser."""
+        if self._dom is None:
+            self._dom = dom_from_snapshot(self)
+        return self._dom
+
+    def tags(self, name):
+        """Return every indexed tag with the given name, in document order."""
+        return self._tags.get(name, [])
+
+    @property
+    def forms(self):
+        return self.tags('form')
+
+    @property
+    def inputs(self):
+        return self.tags('input')
+
+    @property
+    def scripts(self):
+        return self.tags('script')
+
+    @property
+    def meta_tags(self):
+        return self.tags('meta')
+
+    @property
+    def links(self):
+        """Raw URL references from anchors, form actions, iframes and link tags."""
+        return [
+            tag[attribute]
+            for name, attribute in LINK_ATTRIBUTES.items()
+            for tag in self.tags(name)
+            if tag.has_attr(attribute)
+        ]
+
+    def meta(self, name):
+        """Return the first <meta name=...> tag with the given name, or None."""
+        for tag in self.meta_tags:
+            if tag.get('name') == name:
+                return tag
+        return None
@@ -0,0 +1,185 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import Counter
+from modules.utils import write_atomic
+
+# Bump when the score table layout changes so stored tables are retrained
+TABLE_VERSION = 1
+
+class PayloadRanker:
+    """Rank payloads per context with a classifier trained once and stored as a score table.
+
+    The model's only features are a one-hot context and a one-hot payload,
+    so its prediction for every (context, payload) pair -- including an
+    unseen context or payload, whose one-hot block is all zeros -- can be
+    computed in one batch after training. That table is what is persisted
+    and loaded; ranking is a dictionary lookup, and scikit-learn is only
+    imported when the table has to be (re)built.
+
+    Recorded outcomes are kept as success/failure counts per (context,
+    payload) pair and trained on as weighted samples, so the history and
+    the cost of retraining grow with the number of distinct pairs, not
+    with the number of probes ever sent.
+
+    Layout under ``directory``:
+        scores.json     the score table and the signature of its training inputs
+        outcomes.json   [context, payload, successes, failures] per pair seen during scans
+
+    Args:
+        seed (list): (context, payload, success) examples always trained on.
+        candidates (dict): context -> payloads that must have exact scores.
+        directory (str): Where the table and recorded outcomes are kept.
+    """
+
+    def __init__(self, seed=(), candidates=None, directory=".cache/payload_ranker"):
+        self.seed = [tuple(example) for example in seed]
+        self.candidates = {context: list(payloads) for context, payloads in (candidates or {}).items()}
+        self.directory = directory
+        self.table_path = os.path.join(directory, "scores.json")
+        self.outcomes_path = os.path.join(directory, "outcomes.json")
+        self._table = None
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def rank(self, context, payloads):
+        """Return payloads ordered from most to least likely to succeed in a context."""
+        scores = self.scores(context, payloads)
+        return sorted(payloads, key=lambda payload: -scores[payload])
+
+    def best(self, context, payloads):
+        """Return the payload most likely to succeed in a context."""
+        return self.rank(context, payloads)[0]
+
+    def scores(self, context, payloads):
+        """Return {payload: probability of success} for a context."""
+        table = self._load()
+        row = table['contexts'].get(context, table['unknown_context'])
+        default = row['']
+        return {payload: row.get(payload, default) for payload in payloads}
+
+    def record(self, context, payload, success):
+        """Remember the outcome of a payload; it is trained on after flush(retrain=True)."""
+        with self._lock:
+            self._pending.append({'context': context, 'payload': payload, 'success': int(bool(success))})
+
+    def flush(self, retrain=True):
+        """Add recorded outcomes to the stored counts and, if there were any, rebuild the score table."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        counts = self._recorded_counts()
+        for outcome in pending:
+            counts[(outcome['context'], outcome['payload'], outcome['success'])] += 1
+        self._write_json(self.outcomes_path, [[context, payload, counts[(context, payload, 1)], counts[(context, payload, 0)]]
+                                              for context, payload in sorted({(c, p) for c, p, _ in counts})])
+        if retrain:
+            self.retrain()
+
+    def retrain(self):
+        """Fit the classifier on the seed and recorded outcomes and store its score table."""
+        examples = self.seed + [(context, payload, success, count)
+                                for (context, payload, success), count in self._recorded_counts().items() if count]
+        table = build_score_table(examples, self.candidates)
+        table['version'] = TABLE_VERSION
+        table['signature'] = self._signature()
+        self._write_json(self.table_path, table)
+        with self._lock:
+            self._table = table
+        logging.info(f"Trained payload ranker on {sum(example_weight(example) for example in examples)} outcomes "
+                     f"({len(examples)} weighted examples)")
+        return table
+
+    def _load(self):
+        table = self._table
+        if table is not None:
+            return table
+        try:
+            with open(self.table_path, "r") as f:
+                table = json.load(f)
+        except (OSError, ValueError):
+            table = None
+        # Retrain when the stored table was built for other seed examples or candidates
+        if table is None or table.get('version') != TABLE_VERSION or table.get('signature') != self._signature():
+            return self.retrain()
+        with self._lock:
+            self._table = table
+        return table
+
+    def _recorded_counts(self):
+        # (context, payload, success) -> number of times it was observed
+        counts = Counter()
+        try:
+            with open(self.outcomes_path, "r") as f:
+                for context, payload, successes, failures in json.load(f):
+                    counts[(context, payload, 1)] += successes
+                    counts[(context, payload, 0)] += failures
+        except (OSError, ValueError, TypeError):
+            pass
+        return counts
+
+    def _write_json(self, path, data):
+        os.makedirs(self.directory, exist_ok=True)
+        write_atomic(path, json.dumps(data))
+
+    def _signature(self):
+        inputs = json.dumps([self.seed, sorted(self.candidates.items())], sort_keys=True)
+        return hashlib.sha256(inputs.encode('utf-8')).hexdigest()
+
+def example_weight(example):
+    """How many observations a (context, payload, success[, weight]) example stands for."""
+    return example[3] if len(example) > 3 else 1
+
+def build_score_table(examples, candidates=None):
+    """Fit a RandomForestClassifier on (context, payload, success[, weight]) examples and score every pair in one batch.
+
+    Identical examples are merged into one weighted sample before fitting.
+
+    Returns:
+        dict: {'contexts': {context: {payload: score, '': unseen-payload score}},
+        'unknown_context': {payload: score, '': score}}
+    """
+    # Deferred so that scans which never retrain do not pay for importing scikit-learn
+    import numpy as np
+    from sklearn.ensemble import RandomForestClassifier
+
+    candidates = candidates or {}
+    weights = Counter()
+    for example in examples:
+        weights[(example[0], example[1], int(bool(example[2])))] += example_weight(example)
+    samples = sorted(weights)
+    contexts = sorted({context for context, _, _ in samples} | set(candidates))
+    payloads = sorted({payload for _, payload, _ in samples} | {p for values in candidates.values() for p in values})
+    context_index = {context: i for i, context in enumerate(contexts)}
+    payload_index = {payload: len(contexts) + i for i, payload in enumerate(payloads)}
+    width = len(contexts) + len(payloads)
+
+    def encode(pairs):
+        features = np.zeros((len(pairs), width), dtype=np.uint8)
+        for row, (context, payload) in enumerate(pairs):
+            if context in context_index:
+                features[row, context_index[context]] = 1
+            if payload in payload_index:
+                features[row, payload_index[payload]] = 1
+        return features
+
+    # Every known pair, plus all-zero blocks standing for an unseen context or payload
+    grid = [(context, payload) for context in contexts + [None] for payload in payloads + [None]]
+    labels = np.array([success for _, _, success in samples])
+    if len(set(labels)) > 1:
+        model = RandomForestClassifier(n_estimators=100, random_state=0)
+        model.fit(encode([(context, payload) for context, payload, _ in samples]), labels,
+                  sample_weight=np.array([weights[sample] for sample in samples], dtype=float))
+        probabilities = model.predict_proba(encode(grid))[:, list(model.classes_).index(1)]
+    else:
+        # A single observed class leaves nothing to learn
+        probabilities = np.full(len(grid), float(labels[0]) if len(labels) else 0.5)
+
+    table = {'contexts': {}, 'unknown_context': {}}
+    for (context, payload), probability in zip(grid, probabilities):
+        row = table['contexts'].setdefault(context, {}) if context is not None else table['unknown_context']
+        row[payload if payload is not None else ''] = float(probability)
+    return table
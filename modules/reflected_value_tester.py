@@ -1,17 +1,17 @@
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+from collections import namedtuple
+from functools import lru_cache
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import concurrent.futures
-import aiohttp
 import asyncio
 import logging
 import time
-import pandas as pd
-import plotly.express as px
-from sklearn.ensemble import RandomForestClassifier
+from modules.page_snapshot import PageSnapshot
+from modules.drivers import supports_javascript
+from modules.http_client import get_session, get_async_session, import_driver_cookies
+from modules.response_fingerprint import BaselineStore
+from modules.payload_ranker import PayloadRanker
 
 # Configure logging
 logging.basicConfig(filename='reflected_value_tester.log', level=logging.INFO,
@@ -49,157 +49,215 @@ def generate_fuzz_strings():
         "A" * 1000  # Long string
     ]
 
-def predict_best_payload(context):
-    """Predict the best payload for a given context using a pre-trained model."""
-    # Example training data
-    data = {
-        'context': ['html', 'javascript', 'url', 'html'],
-        'payload': ['<img src=x onerror=alert(1)>', "';alert(1);//", "javascript:alert(1)", "<script>alert(1)</script>"],
-        'success': [1, 1, 0, 1]  # 1 = success, 0 = failure
-    }
+PAYLOAD_CONTEXTS = ("html", "javascript", "url")
+
+# Example training data the ranker always starts from
+SEED_OUTCOMES = [
+    ('html', '<img src=x onerror=alert(1)>', 1),
+    ('javascript', "';alert(1);//", 1),
+    ('url', "javascript:alert(1)", 0),
+    ('html', "<script>alert(1)</script>", 1)
+]
 
-    # Train a model
-    df = pd.DataFrame(data)
-    X = pd.get_dummies(df[['context', 'payload']])
-    y = df['success']
-    model = RandomForestClassifier()
-    model.fit(X, y)
+@lru_cache(maxsize=None)
+def get_payload_ranker():
+    """Return the shared payload ranker; its score table is loaded (or trained) on first use."""
+    return PayloadRanker(seed=SEED_OUTCOMES, candidates={context: generate_payloads(context) for context in PAYLOAD_CONTEXTS})
 
-    # Predict the best payload
+def rank_payloads(context):
+    """Return the payloads for a context, most promising first."""
     payloads = generate_payloads(context)
-    predictions = []
-    for payload in payloads:
-        X_test = pd.get_dummies(pd.DataFrame([{'context': context, 'payload': payload}]))
-        X_test = X_test.reindex(columns=X.columns, fill_value=0)
-        predictions.append(model.predict_proba(X_test)[0][1])  # Probability of success
-    return payloads[predictions.index(max(predictions))]
+    try:
+        return get_payload_ranker().rank(context, payloads)
+    except Exception as e:
+        logging.error(f"Error ranking payloads: {e}")
+        return payloads
+
+def predict_best_payload(context):
+    """Predict the best payload for a given context using the trained ranker."""
+    return rank_payloads(context)[0]
 
 def retry_request(url, max_retries=3, delay=1):
     """Retry a request with exponential backoff."""
     for i in range(max_retries):
         try:
-            response = requests.get(url)
+            response = get_session().get(url)
             return response
         except Exception as e:
             logging.error(f"Attempt {i + 1} failed: {e}")
             time.sleep(delay * (2 ** i))  # Exponential backoff
     return None
 
-async def test_form_input_async(session, input_tag, form_action, form_method, form_data):
-    """Test a form input asynchronously."""
-    try:
-        if form_method == 'GET':
-            async with session.get(form_action, params=form_data) as response:
-                return await response.text()
-        else:
-            async with session.post(form_action, data=form_data) as response:
-                return await response.text()
-    except Exception as e:
-        logging.error(f"Error testing form input: {e}")
-        return None
-
-async def test_reflected_values_async(driver, base_domain):
-    """Test reflected values asynchronously."""
-    reflected_values = []
-    test_strings = generate_payloads("html")  # Example: HTML context
-
-    async with aiohttp.ClientSession() as session:
-        tasks = []
-        for input_tag in driver.find_elements(By.TAG_NAME, "input"):
-            if input_tag.get_attribute('name'):
-                for test_string in test_strings:
-                    form = input_tag.find_element(By.XPATH, "./ancestor::form")
-                    form_action = form.get_attribute('action') or driver.current_url
-                    form_method = form.get_attribute('method').upper()
-                    form_data = {input_tag.get_attribute('name'): test_string}
-                    tasks.append(test_form_input_async(session, input_tag, form_action, form_method, form_data))
-
-        results = await asyncio.gather(*tasks)
-        for result in results:
-            if result and any(test_string in result for test_string in test_strings):
-                reflected_values.append({
-                    'url': form_action,
-                    'key': input_tag.get_attribute('name'),
-                    'reflected': True,
-                    'payload': test_string
-                })
-
-    return reflected_values
+def generate_report(reflected_values, path="report.html"):
+    """Generate an HTML report with visualizations; nothing is written when nothing was reflected."""
+    if not reflected_values:
+        return
+    # Deferred: pandas and plotly are only needed for the report
+    import pandas as pd
+    import plotly.express as px
 
-def generate_report(reflected_values):
-    """Generate an HTML report with visualizations."""
     df = pd.DataFrame(reflected_values)
     fig = px.bar(df, x='key', y='reflected', color='payload', title='Reflected Values')
-    fig.write_html("report.html")
+    fig.write_html(path)
+
+# Probes in flight at once against the scanned site
+DEFAULT_CONCURRENCY = 20
+
+Probe = namedtuple("Probe", ["url", "method", "key", "original_value", "payload", "fields"])
+
+def build_probes(snapshot, payloads):
+    """List one probe per (parameter, payload) for the page's query string and named form inputs.
+
+    Query parameter probes resend every other parameter unchanged; form
+    probes submit the single input to the form's action with its method.
+    """
+    probes = []
+    seen = set()
+    page_url = snapshot.url
+    parts = urlsplit(page_url)
+    base_url = urlunsplit(parts._replace(query='', fragment=''))
+    query = parse_qsl(parts.query, keep_blank_values=True)
+
+    def add(url, method, key, original_value, payload, fields):
+        signature = (url, method, key, payload)
+        if signature not in seen:
+            seen.add(signature)
+            probes.append(Probe(url, method, key, original_value, payload, fields))
+
+    # Test query parameters
+    for index, (key, value) in enumerate(query):
+        for payload in payloads:
+            fields = query[:index] + [(key, payload)] + query[index + 1:]
+            add(base_url, 'GET', key, value, payload, fields)
+
+    # Test form inputs
+    for input_tag in snapshot.inputs:
+        form = input_tag.find_parent('form')
+        if not input_tag.get('name') or not form:
+            continue
+        form_action = urljoin(page_url, form.get('action', page_url))
+        form_method = form.get('method', 'GET').upper()
+        for payload in payloads:
+            add(form_action, form_method, input_tag['name'], input_tag.get('value', ''), payload, [(input_tag['name'], payload)])
+    return probes
+
+async def send_probe(session, probe, semaphore, timeout=30):
+    """Send one probe; return (status, text), or None if the request failed."""
+    async with semaphore:
+        try:
+            if probe.method == 'GET':
+                request = session.get(probe.url, params=probe.fields, timeout=timeout)
+            else:
+                request = session.post(probe.url, data=probe.fields, timeout=timeout)
+            async with request as response:
+                return response.status, await response.text(errors='replace')
+        except Exception as e:
+            logging.error(f"Error sending probe for {probe.key} to {probe.url}: {e}")
+            return None
+
+def probe_url(probe):
+    """Return the URL a probe is sent to, including the query string of GET probes."""
+    return f"{probe.url}?{urlencode(probe.fields)}" if probe.method == 'GET' else probe.url
+
+def reflection_result(probe, via):
+    """Describe a reflected probe; ``via`` is 'http' or 'dom'."""
+    return {
+        'url': probe_url(probe),
+        'key': probe.key,
+        'original_value': probe.original_value,
+        'reflected': True,
+        'payload': probe.payload,
+        'via': via
+    }
+
+def baseline_probe(probe):
+    """The same request as a probe, with the parameter's original value instead of the payload."""
+    fields = [(key, probe.original_value if key == probe.key and value == probe.payload else value) for key, value in probe.fields]
+    return probe._replace(payload=None, fields=fields)
+
+async def run_probes(session, probes, concurrency=DEFAULT_CONCURRENCY, baselines=None):
+    """Send probes concurrently and split them into reflected and unreflected.
+
+    Each endpoint (method and URL) is first requested with its original
+    values and recorded in ``baselines``, a BaselineStore. A response without
+    the payload is unreflected after one substring search; the baseline is
+    only consulted for the rest, to rule out payloads the page already
+    contains (see BaselineStore.reflects).
+
+    Returns:
+        tuple: (reflected, unreflected), both lists of Probe in completion order.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    baselines = baselines if baselines is not None else BaselineStore()
+
+    async def record_baseline(probe):
+        response = await send_probe(session, baseline_probe(probe), semaphore)
+        if response is not None:
+            baselines.record((probe.method, probe.url), *response)
+
+    endpoints = {(probe.method, probe.url): probe for probe in probes}
+    await asyncio.gather(*(record_baseline(probe) for key, probe in endpoints.items() if key not in baselines))
 
-def test_reflected_values(driver, base_domain):
-    """Test all parameters for reflected values using advanced techniques."""
+    async def probe_and_check(probe):
+        return probe, await send_probe(session, probe, semaphore)
+
+    reflected, unreflected = [], []
+    for next_result in asyncio.as_completed([probe_and_check(probe) for probe in probes]):
+        probe, response = await next_result
+        if response is not None and baselines.reflects((probe.method, probe.url), response[1], probe.payload):
+            reflected.append(probe)
+        else:
+            unreflected.append(probe)
+    return reflected, unreflected
+
+def check_dom_reflection(driver, probe):
+    """Load a GET probe in the browser and look for the payload in the rendered DOM."""
+    driver.get(probe_url(probe))
+    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+    return probe.payload in driver.page_source
+
+async def test_reflected_values(driver, base_domain, snapshot=None, concurrency=DEFAULT_CONCURRENCY, dom_check=False,
+                                report_path=None):
+    """Test all parameters for reflected values.
+
+    Every (parameter, payload) probe goes over the pooled HTTP session with
+    at most ``concurrency`` in flight. With ``dom_check``, GET probes the
+    server did not reflect are loaded in the browser as well, to catch
+    payloads written into the page by client-side scripts. With
+    ``report_path``, reflected values are also charted in an HTML report there.
+    """
     reflected_values = []
-    test_strings = generate_payloads("html")  # Example: HTML context
+    test_strings = rank_payloads("html")  # Example: HTML context
 
     try:
-        # Get the current page source
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-
-        # Test query parameters
-        query_params = urlparse(driver.current_url).query
-        if query_params:
-            for param in query_params.split('&'):
-                key, value = param.split('=')
-                for test_string in test_strings:
-                    modified_url = driver.current_url.replace(f"{key}={value}", f"{key}={test_string}")
-                    driver.get(modified_url)
-                    WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-                    if test_string in driver.page_source:
-                        reflected_values.append({
-                            'url': modified_url,
-                            'key': key,
-                            'original_value': value,
-                            'reflected': True,
-                            'payload': test_string
-                        })
-
-        # Test form inputs
-        def test_form_input(input_tag):
-            if input_tag.get('name'):
-                for test_string in test_strings:
-                    input_tag['value'] = test_string
-                    form = input_tag.find_parent('form')
-                    if form:
-                        form_action = form.get('action', driver.current_url)
-                        form_method = form.get('method', 'GET').upper()
-                        form_data = {input_tag['name']: test_string}
-
-                        # Set custom headers
-                        headers = {
-                            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36 MrColonel',
-                            'X-Researcher-Username': 'mrcolonel'
-                        }
-
-                        # Submit the form
-                        if form_method == 'GET':
-                            response = requests.get(urljoin(driver.current_url, form_action), params=form_data, headers=headers)
-                        else:
-                            response = requests.post(urljoin(driver.current_url, form_action), data=form_data, headers=headers)
-
-                        # Check if the test string is reflected in the response
-                        if test_string in response.text:
-                            reflected_values.append({
-                                'url': urljoin(driver.current_url, form_action),
-                                'key': input_tag['name'],
-                                'original_value': input_tag.get('value', ''),
-                                'reflected': True,
-                                'payload': test_string
-                            })
-
-        # Use multithreading to test form inputs in parallel
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            executor.map(test_form_input, soup.find_all('input'))
+        # Use the page as it was loaded, even after the driver navigates away
+        snapshot = snapshot or PageSnapshot.from_driver(driver)
+        session = import_driver_cookies(driver, get_async_session())
+        probes = build_probes(snapshot, test_strings)
+
+        reflected, unreflected = await run_probes(session, probes, concurrency)
+        reflected_values.extend(reflection_result(probe, 'http') for probe in reflected)
+
+        # Outcomes feed the payload ranker the next time it is retrained
+        ranker = get_payload_ranker()
+        for probe in reflected:
+            ranker.record("html", probe.payload, True)
+        for probe in unreflected:
+            ranker.record("html", probe.payload, False)
+
+        # Only a browser runs the scripts that could write the payload into the page
+        if dom_check and supports_javascript(driver):
+            for probe in unreflected:
+                if probe.method == 'GET' and check_dom_reflection(driver, probe):
+                    reflected_values.append(reflection_result(probe, 'dom'))
 
     except Exception as e:
         logging.error(f"Error testing reflected values: {e}")
 
-    # Generate a report
-    generate_report(reflected_values)
+    if report_path:
+        try:
+            generate_report(reflected_values, report_path)
+        except Exception as e:
+            logging.error(f"Error generating reflected values report: {e}")
 
-    return reflected_values
\ No newline at end of file
+    return reflected_values
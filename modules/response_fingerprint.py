@@ -0,0 +1,180 @@
+import re
+import math
+from collections import Counter, namedtuple
+
+# Page regions that change between identical requests: timestamps, ids and tokens
+DYNAMIC_PATTERNS = (
+    re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d+)?)?(?:Z|[+-]\d{2}:?\d{2})?"),
+    re.compile(r"\b\d{1,2}:\d{2}:\d{2}\b"),
+    re.compile(r"\b1[5-9]\d{8}(?:\d{3})?\b"),
+    re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"),
+    re.compile(r"[A-Za-z0-9+/_-]{24,}={0,2}"),
+)
+MASK = "\x00"
+
+# Responses whose lengths differ by less than this factor share a length bucket
+LENGTH_BUCKET_RATIO = 1.1
+
+# Bits per counter when the 64 SimHash weights are summed inside one integer
+_FIELD_WIDTH = 24
+_FIELD_MASK = (1 << _FIELD_WIDTH) - 1
+_BYTE_SPREAD = [sum(1 << (bit * _FIELD_WIDTH) for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+Comparison = namedtuple("Comparison", ["same", "changed"])
+
+def mask_dynamic(text, patterns=DYNAMIC_PATTERNS):
+    """Replace the dynamic regions of a page with a fixed marker."""
+    for pattern in patterns:
+        text = pattern.sub(MASK, text)
+    return text
+
+def simhash(features):
+    """64-bit SimHash of weighted features given as {64-bit hash: weight}.
+
+    Each feature's bits are spread into 64 counters packed in one integer
+    (one table lookup per byte), so the cost is per feature, not per bit.
+    """
+    packed = 0
+    total = 0
+    for value, weight in features.items():
+        spread = 0
+        for byte in range(8):
+            spread |= _BYTE_SPREAD[value >> (8 * byte) & 0xFF] << (8 * byte * _FIELD_WIDTH)
+        packed += spread * weight
+        total += weight
+    return sum(1 << bit for bit in range(64) if (packed >> (bit * _FIELD_WIDTH) & _FIELD_MASK) * 2 > total)
+
+def hamming(first, second):
+    """Number of differing bits between two hashes."""
+    return bin(first ^ second).count("1")
+
+def length_bucket(length):
+    return int(math.log(length + 1, LENGTH_BUCKET_RATIO))
+
+def _line_hash(line):
+    return hash(line) & 0xFFFFFFFFFFFFFFFF
+
+class Baseline:
+    """Fingerprint of an endpoint's normal response.
+
+    Keeps the status, length bucket, the hash of every line after masking
+    dynamic regions, a map from raw line hashes to masked ones (so lines a
+    probe leaves untouched are never masked again) and a SimHash of the
+    masked lines. The raw text is kept too, so a search string can be
+    looked up in it directly.
+    """
+
+    def __init__(self, status, text, patterns=DYNAMIC_PATTERNS):
+        self.patterns = patterns
+        self.status = status
+        self.text = text
+        self.length_bucket = length_bucket(len(text))
+        lines = text.split("\n")
+        self.line_count = len(lines)
+        self.masked = {}
+        features = Counter()
+        for line in lines:
+            raw = _line_hash(line)
+            masked = self.masked.get(raw)
+            if masked is None:
+                masked = self.masked[raw] = _line_hash(mask_dynamic(line, patterns))
+            features[masked] += 1
+        self.masked_lines = set(features)
+        self.simhash = simhash(features)
+        self.stable = True
+        self.noise = 0
+
+    def diff(self, text):
+        """Return (identical, changed_lines, features) for a response text.
+
+        identical is True when every masked line occurs in the baseline and
+        the line counts agree; changed_lines are the masked lines that do not.
+        """
+        lines = text.split("\n")
+        changed = []
+        features = Counter()
+        for line in lines:
+            masked = self.masked.get(_line_hash(line))
+            if masked is None:
+                masked_line = mask_dynamic(line, self.patterns)
+                masked = _line_hash(masked_line)
+                if masked not in self.masked_lines:
+                    changed.append(masked_line)
+            features[masked] += 1
+        return not changed and len(lines) == self.line_count, changed, features
+
+class BaselineStore:
+    """Per-endpoint baseline fingerprints that probe responses are compared against.
+
+    Record an endpoint's normal response, ideally twice to learn how much it
+    varies by itself. A probe response whose masked lines all occur in the
+    baseline is the same page and can be discarded without further checks.
+    If the baseline varies, a response with the same status and length bucket
+    whose SimHash is within the observed noise plus ``margin`` bits also
+    counts as the same page. ``compare`` also returns the lines that differ
+    from the baseline, so reflection checks skip the unchanged bulk.
+    """
+
+    def __init__(self, margin=3, patterns=DYNAMIC_PATTERNS):
+        self.margin = margin
+        self.patterns = patterns
+        self._baselines = {}
+
+    def __contains__(self, key):
+        return key in self._baselines
+
+    def record(self, key, status, text):
+        """Add a normal response for an endpoint; repeated calls measure its variability."""
+        baseline = self._baselines.get(key)
+        if baseline is None:
+            self._baselines[key] = Baseline(status, text, self.patterns)
+            return
+        identical, _, features = baseline.diff(text)
+        if status != baseline.status or not identical:
+            baseline.stable = False
+            baseline.noise = max(baseline.noise, hamming(simhash(features), baseline.simhash))
+
+    def reflects(self, key, text, needle):
+        """Return True if ``needle`` occurs in a response where the endpoint's baseline does not have it.
+
+        Checks run cheapest first: a substring search of the response, an
+        exact comparison with the baseline, a substring search of the
+        baseline, and only when the baseline contains the needle as well,
+        the line diff.
+        """
+        if needle not in text:
+            return False
+        baseline = self._baselines.get(key)
+        if baseline is None:
+            return True
+        if len(text) == len(baseline.text) and text == baseline.text:
+            return False
+        if needle not in baseline.text:
+            return True
+        _, changed, _ = baseline.diff(text)
+        return any(needle in line for line in changed)
+
+    def matches(self, key, status, text):
+        """Return True if a response is the endpoint's baseline page."""
+        return self.compare(key, status, text).same
+
+    def compare(self, key, status, text):
+        """Compare a response with the endpoint's baseline.
+
+        Returns:
+            Comparison: ``same`` as for matches(); ``changed`` is the masked
+            text of the lines not found in the baseline ('' when there are
+            none, the whole text if the endpoint has no baseline).
+        """
+        baseline = self._baselines.get(key)
+        if baseline is None:
+            return Comparison(False, text)
+        identical, changed, features = baseline.diff(text)
+        changed = "\n".join(changed)
+        if status != baseline.status:
+            return Comparison(False, changed)
+        if identical:
+            return Comparison(True, changed)
+        if baseline.stable or length_bucket(len(text)) != baseline.length_bucket:
+            return Comparison(False, changed)
+        return Comparison(hamming(simhash(features), baseline.simhash) <= baseline.noise + self.margin, changed)
@@ -0,0 +1,185 @@
+import os
+import re
+import gzip
+import json
+import time
+import hashlib
+import logging
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+COMPRESSION_SUFFIXES = {None: "", 'gzip': ".gz", 'zstd': ".zst"}
+
+# Seconds between flushes while a stage is writing records; every stage also ends with a flush
+FLUSH_INTERVAL = 1.0
+
+def serialize(record):
+    """Encode a record as one JSON line, with orjson when it is installed.
+
+    Values JSON has no type for (bytes, sets, exceptions) are written as str().
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(record, default=str, option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS)
+        except orjson.JSONEncodeError:
+            # e.g. integers wider than 64 bits, which the json module handles
+            pass
+    return (json.dumps(record, default=str, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+def open_compressed(path, compression=None, mode="xb"):
+    """Open a results file for binary writing ('xb'/'ab') or reading ('rb') with its compression."""
+    if compression is None:
+        return open(path, mode)
+    if compression == 'gzip':
+        return gzip.open(path, mode)
+    if compression == 'zstd':
+        import zstandard
+        raw = open(path, mode)
+        if mode == "rb":
+            return zstandard.ZstdDecompressor().stream_reader(raw, closefd=True)
+        return zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+    raise ValueError(f"Unknown compression: {compression}")
+
+class ResultsWriter:
+    """JSON Lines results of one scanned URL, written record by record as stages finish.
+
+    Record types:
+        page     {'type', 'url', 'started'} -- always the first line
+        finding  {'type', 'stage', 'data'} -- one per list item a stage returned,
+                 or one holding the whole result if it is not a list
+        error    {'type', 'message'}
+        summary  {'type', 'findings': {stage: count}, 'errors', 'seconds'} -- the
+                 last line, missing if the scan crashed
+
+    Records are flushed at least every ``flush_interval`` seconds and at the
+    end of every stage, so a crash loses at most the stage in progress.
+    """
+
+    def __init__(self, path, url, compression=None, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.url = url
+        self.flush_interval = flush_interval
+        self._stream = open_compressed(path, compression)
+        self._last_flush = time.monotonic()
+        self._started = time.time()
+        self.findings = {}
+        self.errors = []
+        self.write({'type': 'page', 'url': url, 'started': self._started})
+        self.flush()
+
+    def write(self, record):
+        """Append one record, flushing if the last flush is older than flush_interval."""
+        self._stream.write(serialize(record))
+        if time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def stage(self, name, result):
+        """Write a stage's result as finding records and flush."""
+        items = result if isinstance(result, list) else [result]
+        for item in items:
+            self.write({'type': 'finding', 'stage': name, 'data': item})
+        self.findings[name] = self.findings.get(name, 0) + len(items)
+        self.flush()
+
+    def error(self, message):
+        """Write an error record and flush."""
+        self.errors.append(message)
+        self.write({'type': 'error', 'message': message})
+        self.flush()
+
+    def flush(self):
+        # A gzip sync flush / zstd block flush: everything so far stays readable after a crash
+        self._stream.flush()
+        self._last_flush = time.monotonic()
+
+    def summary(self):
+        """What was written: the file, finding counts per stage and the error messages."""
+        return {'path': self.path, 'findings': dict(self.findings), 'errors': list(self.errors)}
+
+    def close(self):
+        """Write the summary record and close the file."""
+        if self._stream.closed:
+            return
+        try:
+            self.write({'type': 'summary', 'findings': self.findings, 'errors': len(self.errors),
+                        'seconds': round(time.time() - self._started, 3)})
+        finally:
+            self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class ResultsSink:
+    """Hands out one results file per scanned URL.
+
+    Files are named ``<domain>-<sha1(url)[:12]>-<time>.jsonl[.gz|.zst]`` and
+    opened exclusively, so two URLs on one domain, a URL listed twice, and
+    repeated runs all get files of their own instead of overwriting each other.
+
+    Args:
+        directory (str): Where result files are created.
+        compression (str): None, 'gzip' or 'zstd' (needs the zstandard package).
+        flush_interval (float): Maximum seconds records stay buffered.
+    """
+
+    def __init__(self, directory="results", compression=None, flush_interval=FLUSH_INTERVAL):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unknown compression: {compression}")
+        if compression == 'zstd':
+            # Fail before the scan starts rather than on the first result
+            import zstandard  # noqa: F401
+        self.directory = directory
+        self.compression = compression
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+
+    def open(self, url):
+        """Create the results file for a URL and return its ResultsWriter."""
+        stem = self._stem(url)
+        suffix = ".jsonl" + COMPRESSION_SUFFIXES[self.compression]
+        attempt = 1
+        while True:
+            name = stem if attempt == 1 else f"{stem}-{attempt}"
+            path = os.path.join(self.directory, name + suffix)
+            try:
+                writer = ResultsWriter(path, url, self.compression, self.flush_interval)
+            except FileExistsError:
+                attempt += 1
+                continue
+            logging.info(f"Writing results for {url} to {path}")
+            return writer
+
+    def _stem(self, url):
+        domain = re.sub(r"[^\w.-]", "_", url.split("://", 1)[-1].split("/", 1)[0]) or "results"
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+        return f"{domain}-{digest}-{time.strftime('%Y%m%dT%H%M%S')}"
+
+def read_results(path):
+    """Yield the records of a results file, compressed or not.
+
+    A file cut short by a crash yields every complete record before the cut.
+    """
+    compression = next((name for name, suffix in COMPRESSION_SUFFIXES.items() if suffix and path.endswith(suffix)), None)
+    with open_compressed(path, compression, "rb") as f:
+        buffered = b""
+        while True:
+            try:
+                # read1 returns what is decompressed so far instead of failing the whole read at a cut
+                chunk = f.read1(64 * 1024)
+            except (EOFError, OSError, ValueError) as e:
+                # Truncated compressed stream
+                logging.warning(f"Results file {path} ends early: {e}")
+                chunk = b""
+            if not chunk:
+                break
+            buffered += chunk
+            *lines, buffered = buffered.split(b"\n")
+            for line in lines:
+                if line:
+                    yield json.loads(line)
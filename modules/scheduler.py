@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import threading
+import concurrent.futures
+from collections import defaultdict, deque
+from urllib.parse import urlparse
+from modules.utils import ensure_url_scheme
+from modules.http_client import close_async_session
+from modules.metrics import metrics
+
+_worker_state = threading.local()
+_worker_loops = []
+_worker_loops_lock = threading.Lock()
+
+def host_of(url):
+    """Return the host a URL belongs to, for per-host concurrency limits."""
+    try:
+        return urlparse(ensure_url_scheme(url)).netloc.lower()
+    except ValueError:
+        return url
+
+def run_in_worker_loop(coro):
+    """Run a coroutine to completion on the calling thread's own event loop.
+
+    Each worker thread keeps a single loop for its lifetime so that
+    loop-bound resources (e.g. HTTP sessions) survive across URLs.
+    """
+    loop = getattr(_worker_state, 'loop', None)
+    if loop is None:
+        loop = asyncio.new_event_loop()
+        _worker_state.loop = loop
+        with _worker_loops_lock:
+            _worker_loops.append(loop)
+    return loop.run_until_complete(coro)
+
+def close_worker_loops():
+    """Close the event loops created by run_in_worker_loop, and their HTTP sessions, once all workers are idle."""
+    with _worker_loops_lock:
+        loops = list(_worker_loops)
+        _worker_loops.clear()
+    for loop in loops:
+        try:
+            loop.run_until_complete(close_async_session())
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            loop.close()
+
+class ScanScheduler:
+    """Run blocking per-URL jobs on a bounded pool of worker threads.
+
+    At most ``workers`` URLs are in flight overall and at most
+    ``max_per_host`` of them target the same host. URLs are pulled from the
+    input lazily, so arbitrarily long lists are never fully materialised.
+    """
+
+    def __init__(self, workers=4, max_per_host=2, key=host_of):
+        if workers < 1:
+            raise ValueError("Scheduler needs at least one worker.")
+        self.workers = workers
+        self.max_per_host = max(1, max_per_host)
+        self.lookahead = workers * 16
+        self._key = key
+
+    def run(self, urls, job):
+        """Yield ``(url, result)`` pairs as jobs finish, in completion order.
+
+        A job that raises yields the exception object as its result.
+        """
+        source = iter(urls)
+        deferred = deque()
+        per_host = defaultdict(int)
+        in_flight = {}
+        exhausted = False
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="scan-worker") as executor:
+            while True:
+                # Fill free worker slots, skipping hosts that are at their cap.
+                skipped = deque()
+                while len(in_flight) < self.workers:
+                    if deferred:
+                        url = deferred.popleft()
+                    elif not exhausted and len(skipped) < self.lookahead:
+                        try:
+                            url = next(source)
+                        except StopIteration:
+                            exhausted = True
+                            continue
+                    else:
+                        break
+
+                    host = self._key(url)
+                    if per_host[host] >= self.max_per_host:
+                        skipped.append(url)
+                        continue
+                    per_host[host] += 1
+                    in_flight[executor.submit(job, url)] = (url, host)
+                deferred.extendleft(reversed(skipped))
+                metrics.gauge('scheduler_in_flight', len(in_flight))
+                metrics.gauge('scheduler_deferred', len(deferred))
+
+                if not in_flight:
+                    if exhausted and not deferred:
+                        return
+                    continue
+
+                done, _ = concurrent.futures.wait(in_flight, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    url, host = in_flight.pop(future)
+                    per_host[host] -= 1
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logging.error(f"Error analyzing {url}: {e}")
+                        result = e
+                    yield url, result
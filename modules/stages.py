@@ -0,0 +1,204 @@
+import os
+import sys
+import importlib
+import logging
+
+class Stage:
+    """One analysis step that can be switched on from the command line.
+
+    Args:
+        name (str): Unique stage name.
+        run: Coroutine function taking a StageContext; its return value is
+            stored under ``result_key`` (if set).
+        enabled: Function of the parsed arguments; True runs the stage.
+        imports (tuple): Modules the stage needs. They are imported only
+            when the stage is enabled, so heavy dependencies of unused
+            stages never load.
+        result_key (str): Key of the results dictionary the output goes to.
+        message (str): Logged before the stage runs.
+        action (str): Completes "Error <action>: ..." when the stage fails.
+        setup: Optional function of the arguments, run once per scan, that
+            returns shared resources (a dict) for StageContext.resources.
+        teardown: Optional function of (arguments, resources) run at the end.
+        needs_browser: Optional function of the arguments; True means the
+            stage depends on a real browser (captured traffic, script
+            execution), so ``--backend auto`` never runs it over plain HTTP.
+    """
+
+    def __init__(self, name, run, enabled, imports=(), result_key=None, message=None, action=None, setup=None, teardown=None,
+                 needs_browser=None):
+        self.name = name
+        self.run = run
+        self.enabled = enabled
+        self.imports = tuple(imports)
+        self.result_key = result_key
+        self.message = message or f"Running stage {name}..."
+        self.action = action or f"running stage {name}"
+        self.setup = setup
+        self.teardown = teardown
+        self.needs_browser = needs_browser or (lambda args: False)
+
+    def load(self):
+        """Import the stage's modules."""
+        for module in self.imports:
+            importlib.import_module(module)
+
+class StageContext:
+    """What a stage gets to work with: the loaded page and the scan's shared resources."""
+
+    def __init__(self, url, base_domain, driver, snapshot, args, resources, results_path=None):
+        self.url = url
+        self.base_domain = base_domain
+        self.driver = driver
+        self.snapshot = snapshot
+        self.args = args
+        self.resources = resources
+        self.results_path = results_path
+
+    def output_path(self, suffix):
+        """Path of an extra output file for this URL, named after its results file; None without one."""
+        if not self.results_path:
+            return None
+        return self.results_path.split(".jsonl", 1)[0] + suffix
+
+# Registered stages in the order they run
+STAGES = {}
+
+def register_stage(stage):
+    """Add a stage to the registry; a stage with the same name is replaced in place."""
+    STAGES[stage.name] = stage
+    return stage
+
+def stage(name, enabled, **options):
+    """Decorator registering a coroutine function as a stage."""
+    def decorator(run):
+        register_stage(Stage(name, run, enabled, **options))
+        return run
+    return decorator
+
+def enabled_stages(args):
+    """Return the registered stages switched on by the arguments, with their modules imported."""
+    stages = [stage for stage in STAGES.values() if stage.enabled(args)]
+    for stage in stages:
+        stage.load()
+    return stages
+
+def needs_browser(stages, args):
+    """Return True if any of the stages must see the page in a real browser."""
+    return any(stage.needs_browser(args) for stage in stages)
+
+def setup_stages(stages, args):
+    """Run every stage's setup and return the merged resources."""
+    resources = {}
+    for stage in stages:
+        if stage.setup:
+            resources.update(stage.setup(args) or {})
+    return resources
+
+def teardown_stages(stages, args, resources):
+    """Run every stage's teardown, logging (not raising) failures."""
+    for stage in stages:
+        if stage.teardown:
+            try:
+                stage.teardown(args, resources)
+            except Exception as e:
+                logging.error(f"Error shutting down stage {stage.name}: {e}")
+
+# Built-in stages. Each imports its module inside the function body so that
+# only enabled stages pay for their dependencies.
+
+@stage('input_fields', lambda args: args.input_fields, imports=("modules.input_extractor",),
+       result_key='input_fields', message="Extracting input fields from the page...", action="extracting input fields")
+async def input_fields_stage(context):
+    from modules.input_extractor import extract_input_fields
+    return extract_input_fields(context.driver, context.snapshot)
+
+def _open_blob_store(args):
+    from modules.blob_store import BlobStore
+    return {'blob_store': BlobStore(os.path.join(args.output_dir, "blobs"))}
+
+def _close_blob_store(args, resources):
+    logging.info(f"Captured bodies: {resources['blob_store'].stats()}")
+
+@stage('network_requests', lambda args: args.network_requests, imports=("modules.network_analyzer", "modules.blob_store"),
+       result_key='network_requests', message="Analyzing network requests...", action="analyzing network requests",
+       setup=_open_blob_store, teardown=_close_blob_store, needs_browser=lambda args: True)
+async def network_requests_stage(context):
+    from modules.network_analyzer import analyze_network_requests
+    return analyze_network_requests(context.driver, context.base_domain, blobs=context.resources['blob_store'])
+
+@stage('hidden_parameters', lambda args: args.hidden_parameters, imports=("modules.hidden_parameter_extractor",),
+       result_key='hidden_parameters', message="Extracting hidden parameters...", action="extracting hidden parameters",
+       needs_browser=lambda args: True)
+async def hidden_parameters_stage(context):
+    from modules.hidden_parameter_extractor import extract_hidden_parameters
+    return extract_hidden_parameters(context.driver, context.snapshot)
+
+def _load_wordlist(args):
+    from modules.hidden_parameter_extractor import load_wordlist
+    return {'wordlist': load_wordlist(args.discover_params)}
+
+@stage('discover_parameters', lambda args: bool(args.discover_params), imports=("modules.hidden_parameter_extractor", "modules.http_client"),
+       result_key='discovered_parameters', message="Brute-forcing candidate parameter names...", action="discovering parameters",
+       setup=_load_wordlist)
+async def discover_parameters_stage(context):
+    from modules.hidden_parameter_extractor import discover_parameters
+    from modules.http_client import get_async_session, import_driver_cookies
+    args = context.args
+    parameters, requests_sent = await discover_parameters(
+        context.snapshot.url, context.resources['wordlist'], import_driver_cookies(context.driver, get_async_session()),
+        method=args.discover_method, batch_size=args.discover_batch_size)
+    logging.info(f"Parameter discovery sent {requests_sent} requests")
+    return parameters
+
+def _open_js_resources(args):
+    from modules.js_cache import JSCache
+    from modules.js_analyzer import create_analysis_executor
+    return {
+        'js_cache': None if args.no_js_cache else JSCache(args.js_cache_dir, args.js_cache_size * 1024 * 1024),
+        'js_executor': create_analysis_executor(args.js_workers)
+    }
+
+def _close_js_resources(args, resources):
+    if resources.get('js_executor'):
+        if sys.version_info >= (3, 9):
+            resources['js_executor'].shutdown(cancel_futures=True)
+        else:
+            # cancel_futures is new in 3.9; older versions wait for queued analyses
+            resources['js_executor'].shutdown()
+    if resources.get('js_cache'):
+        resources['js_cache'].evict()
+        logging.info(f"JavaScript cache: {resources['js_cache'].stats()}")
+
+@stage('js_files', lambda args: args.js_files, imports=("modules.js_analyzer",),
+       result_key='js_files', message="Searching JavaScript files for parameters...", action="searching JavaScript files",
+       setup=_open_js_resources, teardown=_close_js_resources)
+async def js_files_stage(context):
+    from modules.js_analyzer import search_js_files
+    resources = context.resources
+    return await search_js_files(context.driver, context.url, context.base_domain, context.snapshot,
+                                 resources['js_cache'], resources['js_executor'], context.args.js_max_size * 1024 * 1024)
+
+def _flush_payload_ranker(args, resources):
+    from modules.reflected_value_tester import get_payload_ranker
+    get_payload_ranker().flush()
+
+@stage('reflected_values', lambda args: args.reflected_values, imports=("modules.reflected_value_tester",),
+       result_key='reflected_values', message="Testing for reflected values using 'MrColonel'...", action="testing reflected values",
+       teardown=_flush_payload_ranker, needs_browser=lambda args: args.reflect_dom)
+async def reflected_values_stage(context):
+    from modules.reflected_value_tester import test_reflected_values
+    return await test_reflected_values(context.driver, context.base_domain, context.snapshot,
+                                       context.args.reflect_concurrency, context.args.reflect_dom,
+                                       report_path=context.output_path("-reflected.html"))
+
+@stage('crawl', lambda args: args.crawl, imports=("modules.crawler",),
+       result_key='crawled_urls', message="Crawling the website to discover additional pages...", action="crawling website")
+async def crawl_stage(context):
+    from modules.crawler import crawl_website
+    args = context.args
+    visited_urls = crawl_website(context.driver, context.url, context.base_domain, max_depth=args.crawl_depth,
+                                 max_pages=args.crawl_max_pages, fetchers=args.crawl_fetchers, visited_mode=args.crawl_visited,
+                                 sitemap_path=context.output_path("-sitemap.txt") or "sitemap.txt")
+    logging.info(f"Visited {len(visited_urls)} URLs")
+    return sorted(visited_urls)
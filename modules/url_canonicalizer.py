@@ -0,0 +1,93 @@
+import re
+from urllib.parse import urlsplit, urlunsplit
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+# Query/path parameters that carry a session rather than identify a resource
+SESSION_PARAMETERS = {
+    'jsessionid', 'phpsessid', 'aspsessionid', 'sid', 'sessionid',
+    'session_id', 'cfid', 'cftoken'
+}
+
+PATH_SESSION_ID = re.compile(r';(?:jsessionid|phpsessid|sid)=[^/?#]*', re.I)
+
+def lowercase_scheme_and_host(parts):
+    """Scheme and host names are case-insensitive."""
+    netloc = parts.netloc
+    userinfo, _, hostport = netloc.rpartition('@')
+    netloc = f"{userinfo}@{hostport.lower()}" if userinfo else hostport.lower()
+    return parts._replace(scheme=parts.scheme.lower(), netloc=netloc)
+
+def remove_default_port(parts):
+    """Drop :80 on http and :443 on https."""
+    try:
+        port = parts.port
+    except ValueError:
+        return parts
+    if port is not None and DEFAULT_PORTS.get(parts.scheme) == port:
+        return parts._replace(netloc=parts.netloc.rsplit(':', 1)[0])
+    return parts
+
+def remove_fragment(parts):
+    """Fragments never reach the server."""
+    return parts._replace(fragment='')
+
+def remove_session_ids(parts):
+    """Strip session identifiers from the path and the query string."""
+    path = PATH_SESSION_ID.sub('', parts.path)
+    pairs = [pair for pair in parts.query.split('&') if pair]
+    pairs = [pair for pair in pairs if pair.split('=', 1)[0].lower() not in SESSION_PARAMETERS]
+    return parts._replace(path=path, query='&'.join(pairs))
+
+def sort_query_parameters(parts):
+    """Order query parameters by name, keeping their original encoding and repeated-key order."""
+    pairs = [pair for pair in parts.query.split('&') if pair]
+    pairs.sort(key=lambda pair: pair.split('=', 1)[0])
+    return parts._replace(query='&'.join(pairs))
+
+def normalize_trailing_slash(parts):
+    """Treat '/a/' and '/a' as the same resource and give empty paths a '/'."""
+    path = parts.path
+    if not path:
+        path = '/'
+    elif len(path) > 1 and path.endswith('/'):
+        path = path.rstrip('/') or '/'
+    return parts._replace(path=path)
+
+DEFAULT_RULES = (
+    lowercase_scheme_and_host,
+    remove_default_port,
+    remove_fragment,
+    remove_session_ids,
+    sort_query_parameters,
+    normalize_trailing_slash,
+)
+
+class URLCanonicalizer:
+    """Map equivalent URLs to one canonical string.
+
+    Each rule takes and returns a ``urllib.parse.SplitResult``; rules run in
+    order, so custom rules can be appended or the defaults replaced.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES):
+        self.rules = list(rules)
+
+    def add_rule(self, rule):
+        """Append a rule to the pipeline."""
+        self.rules.append(rule)
+
+    def __call__(self, url):
+        try:
+            parts = urlsplit(url)
+        except ValueError:
+            return url
+        for rule in self.rules:
+            parts = rule(parts)
+        return urlunsplit(parts)
+
+default_canonicalizer = URLCanonicalizer()
+
+def canonicalize_url(url):
+    """Canonicalize a URL with the default rules."""
+    return default_canonicalizer(url)
@@ -1,9 +1,10 @@
 import json
 import os
 import logging
+import tempfile
 from urllib.parse import urlparse, urljoin
-import requests
 from tenacity import retry, stop_after_attempt, wait_exponential
+from modules.http_client import get_session
 
 # Configure logging
 logging.basicConfig(
@@ -36,6 +37,22 @@ def ensure_url_scheme(url):
     
     return url
 
+def read_urls(path):
+    """
+    Yield the URLs of a URL list file one at a time, skipping blank lines.
+    
+    Args:
+        path (str): File with one URL per line.
+    
+    Yields:
+        str: Each URL, stripped of surrounding whitespace.
+    """
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+
 def save_results_to_json(results, base_domain):
     """
     Save the analysis results to a JSON file in the results/ directory.
@@ -79,7 +96,7 @@ def fetch_url(url, headers=None):
         Exception: If the request fails after retries.
     """
     try:
-        response = requests.get(url, headers=headers, timeout=30)
+        response = get_session().get(url, headers=headers, timeout=30)
         response.raise_for_status()  # Raise an exception for HTTP errors
         return response.text
     except Exception as e:
@@ -160,4 +177,26 @@ if __name__ == "__main__":
     print(join_url("https://example.com", "/path/to/resource"))  # Output: https://example.com/path/to/resource
 
     # Test create_directory
-    create_directory("test_directory")
\ No newline at end of file
+    create_directory("test_directory")
+
+def write_atomic(path, data):
+    """
+    Write a file so that readers see either the old or the new contents, never a partial file.
+    
+    The data goes to a temporary file in the same directory, which then
+    replaces ``path``; concurrent writers of the same file are safe.
+    
+    Args:
+        path (str): The file to write; its directory must exist.
+        data (bytes | str): The contents; str is written as UTF-8.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
@@ -0,0 +1,66 @@
+import math
+import hashlib
+
+class VisitedSet:
+    """Membership set for crawled URLs with a bounded memory footprint.
+
+    Modes:
+        exact:  stores the URL strings themselves.
+        hashed: stores a 64-bit digest per URL (collisions are negligible
+                below billions of URLs).
+        bloom:  a fixed-size Bloom filter sized for ``capacity`` entries at
+                ``error_rate`` false positives; memory never grows.
+        auto:   exact until ``exact_limit`` entries, then migrates to hashed.
+    """
+
+    MODES = ('auto', 'exact', 'hashed', 'bloom')
+
+    def __init__(self, mode='auto', capacity=1000000, error_rate=0.001, exact_limit=100000):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown visited-set mode: {mode}")
+        self.mode = 'exact' if mode == 'auto' else mode
+        self._auto = mode == 'auto'
+        self.exact_limit = exact_limit
+        self._count = 0
+        self._items = set()
+        if self.mode == 'bloom':
+            self._bits_count = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+            self._hash_count = max(1, round(self._bits_count / capacity * math.log(2)))
+            self._bits = bytearray((self._bits_count + 7) // 8)
+
+    def __contains__(self, url):
+        if self.mode == 'exact':
+            return url in self._items
+        if self.mode == 'hashed':
+            return _digest(url) in self._items
+        return all(self._bits[i >> 3] & (1 << (i & 7)) for i in self._bit_positions(url))
+
+    def __len__(self):
+        return self._count
+
+    def add(self, url):
+        """Add a URL; return True if it was not already present."""
+        if url in self:
+            return False
+        if self.mode == 'exact':
+            self._items.add(url)
+            if self._auto and len(self._items) > self.exact_limit:
+                self._items = {_digest(item) for item in self._items}
+                self.mode = 'hashed'
+        elif self.mode == 'hashed':
+            self._items.add(_digest(url))
+        else:
+            for i in self._bit_positions(url):
+                self._bits[i >> 3] |= 1 << (i & 7)
+        self._count += 1
+        return True
+
+    def _bit_positions(self, url):
+        # Kirsch-Mitzenmacher double hashing from one 128-bit digest
+        digest = hashlib.blake2b(url.encode('utf-8', 'surrogatepass'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self._bits_count for i in range(self._hash_count)]
+
+def _digest(url):
+    return int.from_bytes(hashlib.blake2b(url.encode('utf-8', 'surrogatepass'), digest_size=8).digest(), 'little')
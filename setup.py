@@ -7,12 +7,14 @@ setup(
     author="MrColonel",
     author_email="mrcolonelhunter@gmail.com",
     url="https://github.com/hrgeek/InputParameterMiner.git",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks"]),
     include_package_data=True,
+    package_data={"modules": ["rules/*.json"]},
     install_requires=[
         "selenium",
         "selenium-wire",
         "beautifulsoup4",
+        "lxml",
         "aiohttp",
         "requests",
         "argparse"